@@ -16,53 +16,98 @@ WSGI Server: Production Ready
 Domain Mapping: Compatible
 """
 
-from flask import Flask, request, jsonify, render_template_string, render_template, make_response, session, Response
+from flask import Flask, request, jsonify, render_template, make_response, session, Response, url_for, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import (Environment, ChoiceLoader, DictLoader, FileSystemLoader,
+                    FileSystemBytecodeCache, select_autoescape)
+from markupsafe import Markup, escape
 import socket
 import os
 import re
 import logging
-import platform
 import subprocess
 import sys
-import webbrowser
 import threading
+import queue
 import time
 import hashlib
-import random
+import json
+import string
+import uuid
+import struct
+import zlib
+import hmac
+import functools
+import types
 from datetime import datetime
-from urllib.parse import urlparse
+
+# Optional fast JSON encoder; the stdlib json module is used when it is missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging for production cloud environments
 logging.basicConfig(
-    level=logging.INFO,
+    level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+# Suppress Waitress logging messages
+logging.getLogger('waitress').setLevel(logging.ERROR)
 
 app = Flask(__name__)
 
+def _dumps_bytes(payload):
+    """
+    Serialize payload to compact JSON bytes, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=str,
+                            option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(',', ':'), default=str).encode()
+
+class _OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson, so jsonify() uses it as well.
+    """
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if orjson is not None:
+    app.json = _OrjsonProvider(app)
+
 # Set a secret key for Flask sessions (required for session management)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'yourl-cloud-secret-key-2024')
 
 # Configuration - Google Cloud Run compatible with domain mapping support
 HOST = '0.0.0.0'  # Listen on all interfaces (required for Cloud Run)
 
-# Port configuration - Use random available port for local development, 8080 for production
-if os.environ.get('PORT'):
-    # Production environment (Cloud Run) - use environment PORT
-    PORT = int(os.environ.get('PORT', 8080))
-else:
-    # Local development - use random available port
-    import socket
-    def find_free_port():
-        """Find a free port to use for local development"""
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind(('', 0))  # Bind to any available port
-            s.listen(1)
-            port = s.getsockname()[1]
-        return port
-    
-    PORT = find_free_port()
+def find_free_port():
+    """Find a free port to use for local development"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('', 0))  # Bind to any available port
+        s.listen(1)
+        port = s.getsockname()[1]
+    return port
+
+# Port configuration - PORT from the environment (Cloud Run), 8080 by default;
+# a random free port only when explicitly running as local development
+PORT = int(os.environ.get('PORT') or
+           (find_free_port() if os.environ.get('YOURL_LOCAL_DEV') == '1' else 8080))
+
+# Display address for users (more user-friendly than 0.0.0.0)
+DISPLAY_HOST = 'localhost' if HOST == '0.0.0.0' else HOST
+LOCAL_URL = f"http://{DISPLAY_HOST}:{PORT}"
+
+# Server selection never changes for the life of the process
+_IS_WINDOWS = sys.platform.startswith("win")
 
 DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
 # Production mode detection - All instances deploy as production instances
@@ -79,224 +124,290 @@ CLOUD_RUN_CONFIG = {
     "readiness_check_path": "/health"  # Readiness check endpoint
 }
 
+# Shared backend clients, created once at startup so requests reuse them.
+# Deployments without the scripts package (or its dependencies) run without them.
+try:
+    from scripts.database_client import DatabaseClient
+    _DB = (DatabaseClient(os.environ['DATABASE_CONNECTION_STRING'])
+           if os.environ.get('DATABASE_CONNECTION_STRING') else None)
+except Exception as e:
+    print(f"❌ Error initializing database client: {e}")
+    _DB = None
+
+# The Secret Manager client holds a gRPC channel, which must not be shared
+# across a fork, so it is created lazily once per process (gunicorn preloads).
+_sm_client = None
+_sm_pid = None
+_sm_lock = threading.Lock()
+
+def _get_sm():
+    """
+    Return this process's Secret Manager client, or None if it is unavailable.
+    """
+    global _sm_client, _sm_pid
+    if _sm_pid != os.getpid():
+        with _sm_lock:
+            if _sm_pid != os.getpid():
+                try:
+                    from scripts.secret_manager_client import SecretManagerClient
+                    _sm_client = SecretManagerClient(os.environ.get('GOOGLE_CLOUD_PROJECT', 'yourl-cloud'))
+                except Exception as e:
+                    print(f"❌ Error initializing Secret Manager client: {e}")
+                    _sm_client = None
+                _sm_pid = os.getpid()
+    return _sm_client
+
+# Fire-and-forget database writes (usage and access logging) are handed to a
+# background thread so their round-trips never delay the response.
+_db_writes = queue.Queue(maxsize=10_000)
+_db_writer_pid = None
+_db_writer_lock = threading.Lock()
+
+_DB_WRITE_BATCH = 100
+
+def _db_write_worker():
+    """
+    Apply queued (method_name, args, kwargs) writes to the shared database client,
+    draining whatever has accumulated (up to _DB_WRITE_BATCH) on each wake-up.
+    """
+    while True:
+        batch = [_db_writes.get()]
+        while len(batch) < _DB_WRITE_BATCH:
+            try:
+                batch.append(_db_writes.get_nowait())
+            except queue.Empty:
+                break
+        for method_name, args, kwargs in batch:
+            try:
+                getattr(_DB, method_name)(*args, **kwargs)
+            except Exception as e:
+                logger.warning("Database logging failed: %s", e)
+
+def _start_db_writer():
+    """
+    Start the write worker for this process (threads do not survive a fork).
+    """
+    global _db_writer_pid
+    with _db_writer_lock:
+        if _db_writer_pid != os.getpid():
+            threading.Thread(target=_db_write_worker, name="db-writes", daemon=True).start()
+            _db_writer_pid = os.getpid()
+
+def _queue_db_write(method_name, *args, **kwargs):
+    """
+    Queue a database write without waiting for it; dropped if the queue is full.
+    """
+    if _db_writer_pid != os.getpid():
+        _start_db_writer()
+    try:
+        _db_writes.put_nowait((method_name, args, kwargs))
+    except queue.Full:
+        logger.warning("Database write queue full, dropping %s", method_name)
+
+if _DB:
+    _start_db_writer()
+
+def _read_git_head():
+    """
+    Read the short git commit hash of the running build.
+    Returns None if git is not available.
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], 
+                                       text=True, stderr=subprocess.DEVNULL).strip()[:8]
+    except:
+        return None
+
+# The commit never changes for the life of the process - read it once
+# instead of forking git on every request
+_GIT_COMMIT_HASH = _read_git_head()
+_NEXT_COMMIT_HASH = _GIT_COMMIT_HASH + "_next" if _GIT_COMMIT_HASH else "next_unknown"
+
+# Fun marketing words and phrases (ASCII only)
+_MARKETING_WORDS = (
+    "CLOUD", "FUTURE", "INNOVATE", "DREAM", "BUILD", "CREATE", "LAUNCH", "FLY",
+    "SPARK", "SHINE", "GLOW", "RISE", "LEAP", "JUMP", "DASH", "ZOOM",
+    "POWER", "MAGIC", "WONDER", "AMAZE", "THRILL", "EXCITE", "INSPIRE", "IGNITE",
+    "ROCKET", "STAR", "MOON", "SUN", "OCEAN", "MOUNTAIN", "FOREST", "RIVER",
+    "TECH", "AI", "CODE", "DATA", "SMART", "FAST", "SECURE", "TRUST",
+    "FRIEND", "FAMILY", "TEAM", "SQUAD", "CREW", "GANG", "TRIBE", "CLAN"
+)
+
+# Fun ASCII symbols and characters
+_ASCII_SYMBOLS = ("!", "@", "#", "$", "%", "&", "*", "+", "=", "?", "~", "^")
+
+def _password_from_number(hash_num):
+    """
+    Build a marketing password from an integer hash.
+    Each part comes from a different slice of the hash - deterministic and
+    thread-safe, unlike seeding the global random module.
+    """
+    # Pick a marketing word
+    word = _MARKETING_WORDS[hash_num % len(_MARKETING_WORDS)]
+    
+    # Pick an ASCII symbol
+    symbol = _ASCII_SYMBOLS[(hash_num >> 8) % len(_ASCII_SYMBOLS)]
+    
+    # Generate a short number (2-3 digits)
+    number = 10 + ((hash_num >> 16) % 990)
+    
+    # Combine them in a fun way (ASCII only)
+    return f"{word}{number}{symbol}"
+
 def generate_marketing_password():
     """
     Generate a fun, marketing-friendly password that changes with each commit.
     Uses git commit hash to ensure consistency within a commit but changes between commits.
     Only uses basic ASCII characters for maximum compatibility.
     """
-    try:
-        # Get the current git commit hash
-        commit_hash = subprocess.check_output(['git', 'rev-parse', 'HEAD'], 
-                                            text=True, stderr=subprocess.DEVNULL).strip()[:8]
-    except:
+    # Use the current git commit hash
+    commit_hash = _GIT_COMMIT_HASH
+    if not commit_hash:
         # Fallback if git is not available
         commit_hash = hashlib.md5(str(datetime.utcnow()).encode()).hexdigest()[:8]
     
-    # Fun marketing words and phrases (ASCII only)
-    marketing_words = [
-        "CLOUD", "FUTURE", "INNOVATE", "DREAM", "BUILD", "CREATE", "LAUNCH", "FLY",
-        "SPARK", "SHINE", "GLOW", "RISE", "LEAP", "JUMP", "DASH", "ZOOM",
-        "POWER", "MAGIC", "WONDER", "AMAZE", "THRILL", "EXCITE", "INSPIRE", "IGNITE",
-        "ROCKET", "STAR", "MOON", "SUN", "OCEAN", "MOUNTAIN", "FOREST", "RIVER",
-        "TECH", "AI", "CODE", "DATA", "SMART", "FAST", "SECURE", "TRUST",
-        "FRIEND", "FAMILY", "TEAM", "SQUAD", "CREW", "GANG", "TRIBE", "CLAN"
-    ]
-    
-    # Fun ASCII symbols and characters
-    ascii_symbols = ["!", "@", "#", "$", "%", "&", "*", "+", "=", "?", "~", "^"]
-    
     # Generate a deterministic but fun password using the commit hash
-    # Convert commit hash to a number for seeding
+    # Convert commit hash to a number
     hash_num = int(commit_hash, 16)
-    random.seed(hash_num)
     
-    # Pick a random marketing word
-    word = random.choice(marketing_words)
-    
-    # Pick a random ASCII symbol
-    symbol = random.choice(ascii_symbols)
-    
-    # Generate a short number (2-3 digits)
-    number = random.randint(10, 999)
-    
-    # Combine them in a fun way (ASCII only)
-    password = f"{word}{number}{symbol}"
-    
-    return password
+    return _password_from_number(hash_num)
+
+@functools.lru_cache(maxsize=256)
+def _log_once(msg, level=logging.INFO):
+    """
+    Log a message the first time it is seen; repeats are swallowed by the cache.
+    """
+    logger.log(level, msg)
+
+# Short-lived in-process cache so the request path does not hit the
+# database / Secret Manager on every call
+_PW_TTL = 30.0  # seconds
+_pw_cache = {"current": (0.0, None), "next": (0.0, None)}
+_pw_lock = threading.Lock()
 
-# Add a module-level flag to track if we've already printed the current code
-_current_code_printed = False
-_next_code_printed = False
+def _cached_password(key, fetch):
+    """
+    Return the cached marketing password for key, calling fetch() to refresh it
+    once it is older than _PW_TTL. The lock keeps concurrent misses from
+    stampeding the backing store.
+    """
+    ts, value = _pw_cache[key]
+    if value is not None and time.monotonic() - ts < _PW_TTL:
+        return value
+    
+    with _pw_lock:
+        # Another thread may have refreshed the value while we waited
+        ts, value = _pw_cache[key]
+        if value is not None and time.monotonic() - ts < _PW_TTL:
+            return value
+        value = fetch()
+        _pw_cache[key] = (time.monotonic(), value)
+        return value
 
 def get_current_marketing_password():
     """
     Get the current live marketing password from database.
     This should only change after successful deployment.
     """
-    global _current_code_printed
-    
+    return _cached_password("current", _fetch_current_marketing_password)
+
+def get_next_marketing_password():
+    """
+    Get the next marketing password from database.
+    This is what will become the current code after next deployment.
+    """
+    return _cached_password("next", _fetch_next_marketing_password)
+
+def _fetch_current_marketing_password():
+    """
+    Look up the current marketing password: database, Secret Manager,
+    BUILD_MARKETING_PASSWORD, then a generated fallback.
+    """
     try:
         # Try database first (cost-effective)
-        database_connection_string = os.environ.get('DATABASE_CONNECTION_STRING')
-        if database_connection_string:
-            from scripts.database_client import DatabaseClient
-            db_client = DatabaseClient(database_connection_string)
-            current_code = db_client.get_current_marketing_code()
+        if _DB:
+            current_code = _DB.get_current_marketing_code()
             
             if current_code:
-                if not _current_code_printed:
-                    print(f"✅ Using database current code: {current_code}")
-                    _current_code_printed = True
+                _log_once(f"✅ Using database current code: {current_code}")
                 return current_code
             else:
-                if not _current_code_printed:
-                    print("⚠️ No current code found in database")
-                    _current_code_printed = True
+                _log_once("⚠️ No current code found in database", logging.WARNING)
     except Exception as e:
-        if not _current_code_printed:
-            print(f"❌ Error accessing database: {e}")
-            _current_code_printed = True
+        _log_once(f"❌ Error accessing database: {e}", logging.ERROR)
     
     # Fallback to Secret Manager (if database not available)
     try:
-        from scripts.secret_manager_client import SecretManagerClient
-        client = SecretManagerClient(os.environ.get('GOOGLE_CLOUD_PROJECT', 'yourl-cloud'))
-        current_code = client.get_current_marketing_code()
+        sm = _get_sm()
+        current_code = sm.get_current_marketing_code() if sm else None
         
         if current_code:
-            if not _current_code_printed:
-                print(f"✅ Using Secret Manager current code: {current_code}")
-                _current_code_printed = True
+            _log_once(f"✅ Using Secret Manager current code: {current_code}")
             return current_code
         else:
-            if not _current_code_printed:
-                print("⚠️ No current code found in Secret Manager")
-                _current_code_printed = True
+            _log_once("⚠️ No current code found in Secret Manager", logging.WARNING)
             
     except Exception as e:
-        if not _current_code_printed:
-            print(f"❌ Error accessing Secret Manager: {e}")
-            _current_code_printed = True
+        _log_once(f"❌ Error accessing Secret Manager: {e}", logging.ERROR)
     
     # Fallback to environment variable
     build_password = os.environ.get('BUILD_MARKETING_PASSWORD')
     if build_password:
-        if not _current_code_printed:
-            print(f"✅ Using BUILD_MARKETING_PASSWORD: {build_password}")
-            _current_code_printed = True
+        _log_once(f"✅ Using BUILD_MARKETING_PASSWORD: {build_password}")
         return build_password
     
     # Last resort: generate based on current commit (should not happen in production)
     fallback_code = generate_marketing_password()
-    if not _current_code_printed:
-        print(f"⚠️ Using fallback generated code: {fallback_code}")
-        _current_code_printed = True
+    _log_once(f"⚠️ Using fallback generated code: {fallback_code}", logging.WARNING)
     return fallback_code
 
-def get_next_marketing_password():
+def _fetch_next_marketing_password():
     """
-    Get the next marketing password from database.
-    This is what will become the current code after next deployment.
+    Look up the next marketing password: database, Secret Manager,
+    then a fallback generated from the current commit.
     """
-    global _next_code_printed
-    
     try:
         # Try database first (cost-effective)
-        database_connection_string = os.environ.get('DATABASE_CONNECTION_STRING')
-        if database_connection_string:
-            from scripts.database_client import DatabaseClient
-            db_client = DatabaseClient(database_connection_string)
-            next_code = db_client.get_next_marketing_code()
+        if _DB:
+            next_code = _DB.get_next_marketing_code()
             
             if next_code:
-                if not _next_code_printed:
-                    print(f"✅ Using database next code: {next_code}")
-                    _next_code_printed = True
+                _log_once(f"✅ Using database next code: {next_code}")
                 return next_code
             else:
-                if not _next_code_printed:
-                    print("⚠️ No next code found in database")
-                    _next_code_printed = True
+                _log_once("⚠️ No next code found in database", logging.WARNING)
     except Exception as e:
-        if not _next_code_printed:
-            print(f"❌ Error accessing database: {e}")
-            _next_code_printed = True
+        _log_once(f"❌ Error accessing database: {e}", logging.ERROR)
     
     # Fallback to Secret Manager (if database not available)
     try:
-        from scripts.secret_manager_client import SecretManagerClient
-        client = SecretManagerClient(os.environ.get('GOOGLE_CLOUD_PROJECT', 'yourl-cloud'))
-        next_code = client.get_next_marketing_code()
+        sm = _get_sm()
+        next_code = sm.get_next_marketing_code() if sm else None
         
         if next_code:
-            if not _next_code_printed:
-                print(f"✅ Using Secret Manager next code: {next_code}")
-                _next_code_printed = True
+            _log_once(f"✅ Using Secret Manager next code: {next_code}")
             return next_code
         else:
-            if not _next_code_printed:
-                print("⚠️ No next code found in Secret Manager")
-                _next_code_printed = True
+            _log_once("⚠️ No next code found in Secret Manager", logging.WARNING)
             
     except Exception as e:
-        if not _next_code_printed:
-            print(f"❌ Error accessing Secret Manager: {e}")
-            _next_code_printed = True
+        _log_once(f"❌ Error accessing Secret Manager: {e}", logging.ERROR)
     
     # Fallback: generate next code based on current commit
-    try:
-        commit_hash = subprocess.check_output(['git', 'rev-parse', 'HEAD'], 
-                                            text=True, stderr=subprocess.DEVNULL).strip()[:8]
-        next_hash = commit_hash + "_next"
-    except:
-        next_hash = "next_unknown"
-    
-    fallback_code = generate_marketing_password_from_hash(next_hash)
-    if not _next_code_printed:
-        print(f"⚠️ Using fallback generated next code: {fallback_code}")
-        _next_code_printed = True
+    fallback_code = generate_marketing_password_from_hash(_NEXT_COMMIT_HASH)
+    _log_once(f"⚠️ Using fallback generated next code: {fallback_code}", logging.WARNING)
     return fallback_code
 
 def generate_marketing_password_from_hash(commit_hash: str):
     """Generate marketing password from specific commit hash"""
-    # Fun marketing words and phrases (ASCII only)
-    marketing_words = [
-        "CLOUD", "FUTURE", "INNOVATE", "DREAM", "BUILD", "CREATE", "LAUNCH", "FLY",
-        "SPARK", "SHINE", "GLOW", "RISE", "LEAP", "JUMP", "DASH", "ZOOM",
-        "POWER", "MAGIC", "WONDER", "AMAZE", "THRILL", "EXCITE", "INSPIRE", "IGNITE",
-        "ROCKET", "STAR", "MOON", "SUN", "OCEAN", "MOUNTAIN", "FOREST", "RIVER",
-        "TECH", "AI", "CODE", "DATA", "SMART", "FAST", "SECURE", "TRUST",
-        "FRIEND", "FAMILY", "TEAM", "SQUAD", "CREW", "GANG", "TRIBE", "CLAN"
-    ]
-    
-    # Fun ASCII symbols and characters
-    ascii_symbols = ["!", "@", "#", "$", "%", "&", "*", "+", "=", "?", "~", "^"]
-    
     # Generate a deterministic but fun password using the commit hash
     # Handle cases where commit_hash might contain non-hex characters
     try:
-        if commit_hash != "unknown" and all(c in '0123456789abcdefABCDEF' for c in commit_hash):
-            hash_num = int(commit_hash, 16)
-        else:
-            hash_num = hash(commit_hash)
-    except ValueError:
+        hash_num = int(commit_hash, 16)
+    except (ValueError, TypeError):
         hash_num = hash(commit_hash)
-    random.seed(hash_num)
-    
-    # Pick a random marketing word
-    word = random.choice(marketing_words)
-    
-    # Pick a random ASCII symbol
-    symbol = random.choice(ascii_symbols)
-    
-    # Generate a short number (2-3 digits)
-    number = random.randint(10, 999)
-    
-    # Combine them in a fun way (ASCII only)
-    password = f"{word}{number}{symbol}"
     
-    return password
+    return _password_from_number(hash_num)
 
 # Friends and Family Guard Ruleset
 FRIENDS_FAMILY_GUARD = {
@@ -311,6 +422,23 @@ FRIENDS_FAMILY_GUARD = {
     "organization": "Yourl Cloud Inc."
 }
 
+# Shortened session id shown on the visual inspection page
+_SESSION_ID_SHORT = FRIENDS_FAMILY_GUARD['session_id'][:8]
+
+# Display strings for the feature flags
+_FF_ENABLED_STR = 'Enabled' if FRIENDS_FAMILY_GUARD['enabled'] else 'Disabled'
+_DOMAIN_MAPPING_STR = 'Enabled' if CLOUD_RUN_CONFIG['domain_mapping_enabled'] else 'Disabled'
+
+# Fields of the authenticated response that are the same for every request
+_RESPONSE_SKELETON = {
+    "status": "authenticated",
+    "ownership": {
+        "perplexity": "current_marketing_password",
+        "cursor": "next_marketing_password"
+    },
+    "organization": FRIENDS_FAMILY_GUARD["organization"]
+}
+
 # Demo configuration for rapid prototyping (replace with proper auth/db for production)
 DEMO_CONFIG = {
     "password": get_current_marketing_password(),  # Dynamic marketing password that changes with commits
@@ -355,21 +483,37 @@ app.config.update(
     # Enable proxy support for X-Forwarded headers
     USE_X_SENDFILE=False,
     # Disable strict host checking for domain mapping compatibility
-    SERVER_NAME=None
+    SERVER_NAME=None,
+    # Static assets (stylesheets) are versioned by build, so let clients keep them
+    SEND_FILE_MAX_AGE_DEFAULT=31536000
 )
 
+# Longest textual IPv6 (with embedded IPv4) and IPv4 addresses
+_MAX_IP_LEN = 45
+_MAX_IPV4_LEN = 15
+
 def get_client_ip():
     """
     Get the real client IP address, handling Cloud Run's X-Forwarded headers.
     Cloud Run sits behind a proxy, so we need to check X-Forwarded-For header.
+    The result is memoized on flask.g for the rest of the request.
     """
+    if 'client_ip' in g:
+        return g.client_ip
     # Check for X-Forwarded-For header (Cloud Run proxy)
     x_forwarded_for = request.headers.get('X-Forwarded-For')
     if x_forwarded_for:
         # X-Forwarded-For can contain multiple IPs, take the first one
-        return x_forwarded_for.split(',')[0].strip()
-    # Fallback to direct connection
-    return request.remote_addr
+        client_ip = x_forwarded_for.partition(',')[0].strip()
+        # Longer than any IPv6 (45) / IPv4 (15) literal means it is not an
+        # address; ignore the spoofable header instead of storing the junk
+        if len(client_ip) > _MAX_IP_LEN or (':' not in client_ip and len(client_ip) > _MAX_IPV4_LEN):
+            client_ip = request.remote_addr
+    else:
+        # Fallback to direct connection
+        client_ip = request.remote_addr
+    g.client_ip = client_ip
+    return client_ip
 
 def get_original_host():
     """
@@ -385,36 +529,139 @@ def get_original_protocol():
     """
     return request.headers.get('X-Forwarded-Proto', 'https')
 
+# User-Agent keywords per device category, checked in priority order
+# (a keyword listed for several categories resolves to the first one)
+_DEVICE_KEYWORDS = (
+    ('watch', ('watch', 'wearable', 'smartwatch', 'apple watch', 'samsung gear')),
+    ('phone', ('mobile', 'android', 'iphone', 'phone', 'blackberry')),
+    ('tablet', ('tablet', 'ipad', 'android')),
+)
+_DEVICE_PRIORITY = {device: rank for rank, (device, _) in enumerate(_DEVICE_KEYWORDS)}
+
+def _build_device_re():
+    """
+    Compile every device keyword into one case-insensitive alternation with
+    a named group per category, so a single pass over the User-Agent finds
+    all category hits.
+    """
+    seen = set()
+    groups = []
+    for device, keywords in _DEVICE_KEYWORDS:
+        # Longest first so e.g. 'smartwatch' wins over 'watch' at the same offset
+        own = sorted((kw for kw in keywords if kw not in seen), key=len, reverse=True)
+        seen.update(own)
+        groups.append(f"(?P<{device}>{'|'.join(re.escape(kw) for kw in own)})")
+    return re.compile('|'.join(groups), re.IGNORECASE)
+
+_DEVICE_RE = _build_device_re()
+
 def detect_device_type(user_agent):
     """
     Detect device type based on User-Agent string.
     Returns: 'pc', 'phone', 'tablet', 'watch', 'unknown'
     """
-    ua_lower = user_agent.lower()
-    
-    # Watch detection (blocked for visual inspection)
-    if any(keyword in ua_lower for keyword in ['watch', 'wearable', 'smartwatch', 'apple watch', 'samsung gear']):
-        return 'watch'
-    
-    # Phone detection
-    if any(keyword in ua_lower for keyword in ['mobile', 'android', 'iphone', 'phone', 'blackberry']):
-        return 'phone'
-    
-    # Tablet detection
-    if any(keyword in ua_lower for keyword in ['tablet', 'ipad', 'android']):
-        return 'tablet'
+    best = None
+    for match in _DEVICE_RE.finditer(user_agent):
+        device = match.lastgroup
+        # Watch is the highest priority (blocked for visual inspection)
+        if device == 'watch':
+            return device
+        if best is None or _DEVICE_PRIORITY[device] < _DEVICE_PRIORITY[best]:
+            best = device
     
     # Default to PC
-    return 'pc'
+    return best or 'pc'
+
+# Device types with a truthy "<device>_allowed" entry in the guard ruleset
+_ALLOWED_DEVICES = frozenset(
+    key[:-len("_allowed")]
+    for key, allowed in FRIENDS_FAMILY_GUARD["visual_inspection"].items()
+    if allowed and key.endswith("_allowed")
+)
 
 def is_visual_inspection_allowed(device_type):
     """
     Check if visual inspection is allowed for the given device type.
     """
-    if not FRIENDS_FAMILY_GUARD["enabled"]:
-        return True
+    return not FRIENDS_FAMILY_GUARD["enabled"] or device_type in _ALLOWED_DEVICES
+
+@app.before_request
+def _cache_request_info():
+    """
+    Resolve the proxy headers and device type once per request so handlers
+    read them from flask.g instead of walking request.headers repeatedly.
+    """
+    if request.endpoint == 'static':
+        return
+    g.client_ip = get_client_ip()
+    g.original_host = get_original_host()
+    g.original_protocol = get_original_protocol()
+    g.user_agent = request.headers.get('User-Agent', 'Unknown')
+    g.device_type = detect_device_type(g.user_agent)
+
+@app.after_request
+def _cache_static_assets(response):
+    """
+    Static assets are referenced with ?v=<build>, so they can be cached
+    for a year and revalidated by ETag.
+    """
+    if request.endpoint == 'static':
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+        if response.status_code == 200:
+            response.add_etag()
+            response.make_conditional(request)
+    return response
+
+# On-the-fly gzip for HTML/JSON responses that were not precompressed
+_COMPRESS_MIN_SIZE = 512
+_COMPRESS_LEVEL = 6
+_COMPRESSIBLE_MIMETYPES = frozenset(('text/html', 'application/json', 'text/plain'))
+
+def _gzip_stream(chunks):
+    """
+    Gzip a streamed body chunk by chunk, sync-flushing after each chunk so
+    the client still receives output as it is generated.
+    """
+    compressor = zlib.compressobj(_COMPRESS_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+@app.after_request
+def _compress_response(response):
+    """
+    Gzip HTML and JSON bodies when the client accepts it. File responses,
+    already-encoded bodies and tiny payloads are left alone.
+    """
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in _COMPRESSIBLE_MIMETYPES):
+        return response
     
-    return FRIENDS_FAMILY_GUARD["visual_inspection"].get(f"{device_type}_allowed", False)
+    # The encoding depends on Accept-Encoding even when the body is sent
+    # as-is, so caches must key on it for every compressible response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < _COMPRESS_MIN_SIZE:
+            return response
+        compressor = zlib.compressobj(_COMPRESS_LEVEL, zlib.DEFLATED, 31)
+        response.set_data(compressor.compress(data) + compressor.flush())
+    
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
 
 def get_visitor_data():
     """
@@ -425,25 +672,20 @@ def get_visitor_data():
         # Get visitor ID from session or generate one
         visitor_id = request.cookies.get('visitor_id')
         if not visitor_id:
-            import uuid
-            visitor_id = str(uuid.uuid4())
+            visitor_id = os.urandom(16).hex()
         
         # Check for session-based authentication (for when database is not available)
         session_authenticated = session.get('authenticated', False)
         session_access_code = session.get('last_access_code')
         
-        # Try to get database connection
-        database_connection = os.environ.get('DATABASE_CONNECTION_STRING')
-        if database_connection:
-            from scripts.database_client import DatabaseClient
-            db_client = DatabaseClient(database_connection)
-            
+        # Use the shared database client if available
+        if _DB:
             # Get or create visitor record
-            visitor = db_client.get_or_create_visitor(
+            visitor = _DB.get_or_create_visitor(
                 visitor_id=visitor_id,
-                user_agent=request.headers.get('User-Agent'),
-                ip_address=get_client_ip(),
-                device_type=detect_device_type(request.headers.get('User-Agent', ''))
+                user_agent=g.user_agent,
+                ip_address=g.client_ip,
+                device_type=g.device_type
             )
             
             if visitor:
@@ -467,7 +709,7 @@ def get_visitor_data():
         }
         
     except Exception as e:
-        print(f"⚠️ Error getting visitor data: {e}")
+        logger.warning("Error getting visitor data: %s", e)
         return {
             'visitor_id': request.cookies.get('visitor_id', 'unknown'),
             'tracking_key': None,
@@ -477,26 +719,72 @@ def get_visitor_data():
             'has_used_code': session.get('authenticated', False)
         }
 
-@app.route('/', methods=['GET', 'POST'])
-def main_endpoint():
+# Last timestamp as (epoch_second, datetime, iso_string); swapped as one tuple
+# so concurrent readers never see a mismatched pair.
+_ts_cache = (0, None, "")
+
+def _ts_snapshot():
     """
-    Main endpoint that handles both GET (landing page) and POST (authentication).
-    Compatible with Cloud Run domain mappings with visitor tracking.
+    Current (epoch_second, UTC datetime, ISO string), rebuilt at most once
+    per second; requests within the same second share one snapshot.
     """
-    if request.method == 'GET':
-        # Get current marketing password
-        current_password = get_current_marketing_password()
-        
-        # Get visitor information
-        visitor_data = get_visitor_data()
-        
-        # Create response with no-cache headers to ensure fresh content
-        if os.path.exists('templates/index.html'):
-            response = make_response(render_template('index.html', 
-                                                 marketing_code=current_password,
-                                                 visitor_data=visitor_data))
-        else:
-            response = make_response(f"""
+    global _ts_cache
+    cached = _ts_cache
+    now = int(time.time())
+    if now != cached[0]:
+        dt = datetime.utcfromtimestamp(now)
+        cached = _ts_cache = (now, dt, dt.isoformat())
+    return cached
+
+def _utc_now():
+    """
+    Current UTC time truncated to the second.
+    """
+    return _ts_snapshot()[1]
+
+def _iso_now():
+    """
+    Current UTC time as an ISO string, reformatted at most once per second.
+    """
+    return _ts_snapshot()[2]
+
+def _encode_template(html, *slots):
+    """
+    Split html around the given {slot} markers (in order) and UTF-8 encode the
+    static pieces once, so responses can be assembled with b"".join().
+    """
+    parts = [html]
+    for slot in slots:
+        head, tail = parts.pop().split('{' + slot + '}')
+        parts += [head, tail]
+    return tuple(part.encode('utf-8') for part in parts)
+
+def _fill_template(parts, *values):
+    """
+    Assemble a response body from _encode_template() parts and slot values.
+    """
+    body = [parts[0]]
+    for value, part in zip(values, parts[1:]):
+        body.append(str(value).encode('utf-8'))
+        body.append(part)
+    return b"".join(body)
+
+def _iter_template(parts, *values):
+    """
+    Yield a response body from _encode_template() parts and slot values
+    chunk by chunk, for streaming instead of joining.
+    """
+    yield parts[0]
+    for value, part in zip(values, parts[1:]):
+        yield str(value).encode('utf-8')
+        yield part
+
+# Checked once at startup instead of stat()ing on every GET
+_INDEX_EXISTS = os.path.exists('templates/index.html')
+_HAS_RECOVERY_TMPL = os.path.exists('templates/recovery.html')
+
+# Landing page used when templates/index.html is not deployed
+_INDEX_FALLBACK_PARTS = _encode_template("""
         <!DOCTYPE html>
         <html>
         <head>
@@ -504,16 +792,16 @@ def main_endpoint():
             <meta charset="utf-8">
             <meta name="viewport" content="width=device-width, initial-scale=1">
             <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                h1 {{ color: #333; text-align: center; }}
-                .form-group {{ margin: 20px 0; }}
-                label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                input[type="password"] {{ width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; }}
-                button {{ background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }}
-                button:hover {{ background: #0056b3; }}
-                .info {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                .password-display {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 10px; border-radius: 5px; margin: 10px 0; text-align: center; font-weight: bold; }}
+                body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+                .container { max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+                h1 { color: #333; text-align: center; }
+                .form-group { margin: 20px 0; }
+                label { display: block; margin-bottom: 5px; font-weight: bold; }
+                input[type="password"] { width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; }
+                button { background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }
+                button:hover { background: #0056b3; }
+                .info { background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }
+                .password-display { background: #fff3cd; border: 1px solid #ffeaa7; padding: 10px; border-radius: 5px; margin: 10px 0; text-align: center; font-weight: bold; }
             </style>
         </head>
         <body>
@@ -522,8 +810,8 @@ def main_endpoint():
                 <div class="info">
                     <strong>URL API Server with Visual Inspection</strong><br>
                     Production-ready Flask application with security features.<br>
-                    <strong>Domain:</strong> {get_original_host()}<br>
-                    <strong>Protocol:</strong> {get_original_protocol()}
+                    <strong>Domain:</strong> {host}<br>
+                    <strong>Protocol:</strong> {protocol}
                 </div>
                 <form method="POST">
                     <div class="form-group">
@@ -542,7 +830,436 @@ def main_endpoint():
             </div>
         </body>
         </html>
-        """)
+        """, 'host', 'protocol', 'current_password')
+
+# Stylesheets are cached by browsers for a year, so their URLs carry the build
+_ASSET_VERSION = _GIT_COMMIT_HASH or str(int(time.time()))
+
+# Auth success page: the static shell is encoded once at import; the
+# per-visitor sections between its segments are built by _auth_ok_parts()
+_AUTH_OK_HEAD = ("""
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Yourl.Cloud Inc. - Cloud Infrastructure & API Services</title>
+    <meta name="description" content="Yourl.Cloud Inc. provides cloud infrastructure, API services, and digital solutions. Based in the United States, serving global clients with secure, scalable technology solutions.">
+    <meta name="keywords" content="cloud infrastructure, API services, digital solutions, technology, Yourl.Cloud, United States">
+    <meta name="author" content="Yourl.Cloud Inc.">
+    <meta name="robots" content="index, follow">
+    <meta property="og:title" content="Yourl.Cloud Inc. - Cloud Infrastructure & API Services">
+    <meta property="og:description" content="Secure, scalable cloud infrastructure and API services for modern businesses.">
+    <meta property="og:type" content="website">
+    <meta property="og:url" content="https://yourl.cloud">
+    <meta property="og:site_name" content="Yourl.Cloud Inc.">
+    <link rel="canonical" href="https://yourl.cloud">
+
+    <link rel="stylesheet" href="/static/auth_success.css?v=""" + _ASSET_VERSION + """">
+</head>
+<body>
+    <div class="container">
+        <!-- Header with Company Identity -->
+        <div class="header">
+            <div class="logo">Yourl.Cloud Inc.</div>
+            <div class="tagline">Secure Cloud Infrastructure & API Services</div>
+            <p>United States • Global Operations • Enterprise Solutions</p>
+        </div>
+
+        <!-- Success Banner for Authenticated Users -->
+        <div class="success-banner">
+            <h2>🎉 Welcome to Yourl.Cloud Inc.</h2>
+            <p><strong>Authentication Successful</strong> - You now have access to our enhanced services.</p>
+""").encode()
+
+_AUTH_OK_MIDDLE = """
+        <!-- Company Information for SEO -->
+        <div class="company-info">
+            <div class="info-card">
+                <h3>🏢 About Yourl.Cloud Inc.</h3>
+                <p>Yourl.Cloud Inc. is a leading technology company specializing in cloud infrastructure, API services, and digital solutions. Based in the United States, we serve clients globally with secure, scalable, and innovative technology solutions.</p>
+                <p><strong>Founded:</strong> 2024</p>
+                <p><strong>Headquarters:</strong> United States</p>
+                <p><strong>Industry:</strong> Cloud Computing, API Services, Digital Infrastructure</p>
+            </div>
+
+            <div class="info-card">
+                <h3>🌐 Global Operations</h3>
+                <p>Operating from the United States, Yourl.Cloud Inc. provides services to clients worldwide. Our infrastructure spans multiple regions, ensuring reliable, low-latency access to our services.</p>
+                <p><strong>Primary Region:</strong> US-West1 (Google Cloud)</p>
+                <p><strong>Service Availability:</strong> 24/7 Global Access</p>
+                <p><strong>Compliance:</strong> US-based data centers</p>
+            </div>
+
+            <div class="info-card">
+                <h3>🔒 Security & Compliance</h3>
+                <p>Yourl.Cloud Inc. maintains the highest standards of security and compliance. Our infrastructure is built on Google Cloud Platform, ensuring enterprise-grade security, reliability, and performance.</p>
+                <p><strong>Infrastructure:</strong> Google Cloud Platform</p>
+                <p><strong>Security:</strong> Enterprise-grade encryption</p>
+                <p><strong>Compliance:</strong> Industry-standard protocols</p>
+            </div>
+        </div>
+
+        <!-- Services Section -->
+        <div class="services">
+            <h2>🚀 Our Services</h2>
+            <div class="service-grid">
+                <div class="service-item">
+                    <h4>☁️ Cloud Infrastructure</h4>
+                    <p>Scalable cloud solutions built on Google Cloud Platform, providing reliable and secure infrastructure for modern applications.</p>
+                </div>
+                <div class="service-item">
+                    <h4>🔌 API Services</h4>
+                    <p>RESTful API services with comprehensive documentation, authentication, and monitoring capabilities.</p>
+                </div>
+                <div class="service-item">
+                    <h4>🛡️ Security Solutions</h4>
+                    <p>Enterprise-grade security with encryption, authentication, and compliance features for sensitive data handling.</p>
+                </div>
+                <div class="service-item">
+                    <h4>📊 Analytics & Monitoring</h4>
+                    <p>Real-time monitoring, analytics, and insights to optimize performance and user experience.</p>
+                </div>
+            </div>
+        </div>
+
+        <!-- Privileges & Affiliations Section -->
+        <div class="affiliation-section">
+            <h3>🎯 Your Privileges & Affiliations</h3>
+            <p>Based on your authentication and visit history, you have access to the following privileges:</p>
+
+            <div class="privilege-badge">✅ Authenticated User</div>
+            <div class="privilege-badge">✅ API Access</div>
+            <div class="privilege-badge">✅ Service Monitoring</div>
+            <div class="privilege-badge">✅ Technical Support</div>
+
+""".encode()
+
+_AUTH_OK_TAIL = """
+        </div>
+
+                                        <!-- Navigation -->
+                    <div class="navigation">
+                        <a href="/" class="nav-btn">🏠 Back to Landing Page</a>
+                        <a href="/data" class="nav-btn">📊 Data Stream</a>
+                        <a href="/api" class="nav-btn">🔌 API Documentation</a>
+                        <a href="/status" class="nav-btn">📊 Service Status</a>
+                        <a href="/health" class="nav-btn">❤️ Health Check</a>
+                    </div>
+
+        <!-- Footer with Legal Information -->
+        <div class="footer">
+            <p><strong>Yourl.Cloud Inc.</strong> - Cloud Infrastructure & API Services</p>
+            <p>United States • Global Operations • Enterprise Solutions</p>
+            <p>© 2024 Yourl.Cloud Inc. All rights reserved.</p>
+            <p>Built on Google Cloud Platform • Secure • Scalable • Reliable</p>
+        </div>
+    </div>
+</body>
+</html>
+""".encode()
+
+# Display labels for the experience levels assigned in main_endpoint
+_EXPERIENCE_LABELS = {
+    level: level.replace('_', ' ').title()
+    for level in ('new_user', 'returning_user', 'returning_visitor')
+}
+
+def _auth_ok_parts(visitor_data, experience_level, build_version, current_password):
+    """
+    Assemble the auth success page as a list of bytes: the static shell
+    segments with the per-visitor profile and privileges sections between them.
+    """
+    level = _EXPERIENCE_LABELS.get(experience_level, experience_level)
+    visitor_id = visitor_data.get('visitor_id', 'Unknown')
+    total_visits = visitor_data.get('total_visits', 1)
+    is_new_visitor = visitor_data.get('is_new_visitor', True)
+    has_used_code = visitor_data.get('has_used_code', False)
+    tracking_key = visitor_data.get('tracking_key')
+    
+    parts = [
+        _AUTH_OK_HEAD,
+        f"""            <p>Experience Level: <span class="experience-level {escape(experience_level)}">{level}</span></p>
+        </div>
+
+        <!-- Visitor Information Section -->
+        <div class="visitor-info">
+            <h3>👤 Your Visitor Profile</h3>
+            <p><strong>Visitor ID:</strong> {escape(visitor_id)}</p>
+            <p><strong>Total Visits:</strong> {escape(total_visits)}</p>
+""".encode()
+    ]
+    if is_new_visitor:
+        parts.append(b"            <p><strong>Status:</strong> New Visitor</p>\n")
+    else:
+        parts.append(b"            <p><strong>Status:</strong> Returning Visitor</p>\n")
+    if has_used_code:
+        parts.append(b"            <p><strong>Code Usage:</strong> Has used access codes</p>\n")
+    else:
+        parts.append(b"            <p><strong>Code Usage:</strong> First time using codes</p>\n")
+    if tracking_key:
+        parts.append(f"            <p><strong>Tracking Key:</strong> {escape(tracking_key)}</p>\n".encode())
+    parts.append(b"        </div>\n\n")
+    
+    parts.append(_AUTH_OK_MIDDLE)
+    if not is_new_visitor:
+        parts.append('            <div class="privilege-badge">✅ Returning Customer</div>\n'.encode())
+    if has_used_code:
+        parts.append('            <div class="privilege-badge">✅ Code History Access</div>\n'.encode())
+    parts.append(f"""
+            <p style="margin-top: 15px;"><strong>Access Level:</strong> {level}</p>
+            <p><strong>Build Version:</strong> {escape(build_version)}</p>
+            <p><strong>Current Marketing Code:</strong> {escape(current_password)}</p>
+""".encode())
+    parts.append(_AUTH_OK_TAIL)
+    return parts
+
+# gzip of the auth success page is assembled from raw deflate segments: the
+# static shell is compressed once here (level 9), and only the small dynamic
+# sections are compressed per request. Every segment ends with a full flush,
+# so each is byte-aligned and self-contained and they can simply be
+# concatenated. The CRC32 still covers the whole body per request; it runs
+# at memory speed, unlike compressing the shell again.
+_GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x02\xff'
+
+def _deflate_segment(data, level):
+    """
+    Raw-deflate data into a byte-aligned run of non-final blocks.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH)
+
+_PRECOMPRESSED_SEGMENTS = {
+    segment: _deflate_segment(segment, 9)
+    for segment in (_AUTH_OK_HEAD, _AUTH_OK_MIDDLE, _AUTH_OK_TAIL)
+}
+
+def _gzip_parts(parts):
+    """
+    Build a gzip member for b"".join(parts), reusing the precompressed
+    deflate output for any static segment in parts.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    out = [_GZIP_HEADER]
+    crc = 0
+    size = 0
+    for part in parts:
+        crc = zlib.crc32(part, crc)
+        size += len(part)
+        precompressed = _PRECOMPRESSED_SEGMENTS.get(part)
+        if precompressed is None:
+            out.append(compressor.compress(part))
+        else:
+            out.append(compressor.flush(zlib.Z_FULL_FLUSH))
+            out.append(precompressed)
+    out.append(compressor.flush(zlib.Z_FINISH))
+    out.append(struct.pack('<II', crc, size & 0xffffffff))
+    return b"".join(out)
+
+# Authentication denied page: only the current password changes per request,
+# so a string.Template with a single $current_password slot is enough
+_AUTH_DENIED_TMPL = string.Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Access Denied - Yourl.Cloud</title>
+    <meta charset="utf-8">
+    <link rel="stylesheet" href="/static/auth_denied.css?v=""" + _ASSET_VERSION + """">
+</head>
+<body>
+    <div class="container">
+        <h1>❌ Access Denied</h1>
+        <p>Invalid marketing password. Please try again.</p>
+        <div class="password-hint">
+            <strong>💡 Hint:</strong> The current marketing password is: $current_password
+        </div>
+        <a href="/" class="btn">🔄 Try Again</a>
+    </div>
+</body>
+</html>
+""")
+
+# Visual inspection page, compiled once by Jinja at first use and rendered
+# from the cached template afterwards
+_VISUAL_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Yourl.Cloud - Visual Inspection</title>
+    <link rel="stylesheet" href="{{ url_for('static', filename='visual.css', v=asset_version) }}">
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🔍 Visual Inspection</h1>
+            <p>Yourl.Cloud URL API Server - Real-time Monitoring</p>
+        </div>
+
+        <div class="content">
+            <div class="url-display">
+                <strong>Request URL:</strong><br>
+                {{ url }}
+            </div>
+
+            <div class="info-grid">
+                <div class="info-card">
+                    <h3>📱 Device Information</h3>
+                    <p><strong>Type:</strong> {{ device_type|title }}</p>
+                    <p><strong>Status:</strong> <span class="status-badge status-success">Allowed</span></p>
+                </div>
+
+                <div class="info-card">
+                    <h3>🛡️ Security Status</h3>
+                    <p><strong>Guard:</strong> <span class="status-badge status-success">Enabled</span></p>
+                    <p><strong>Inspection:</strong> <span class="status-badge status-info">Active</span></p>
+                </div>
+
+                <div class="info-card">
+                    <h3>⏰ Timestamp</h3>
+                    <p><strong>Time:</strong> {{ timestamp.strftime('%Y-%m-%d %H:%M:%S UTC') }}</p>
+                    <p><strong>Session:</strong> {{ session_id_short }}...</p>
+                </div>
+
+                <div class="info-card">
+                    <h3>🏢 Organization</h3>
+                    <p><strong>Company:</strong> {{ organization }}</p>
+                    <p><strong>Environment:</strong> <span class="status-badge status-success">Production</span></p>
+                </div>
+
+                <div class="info-card">
+                    <h3>☁️ Cloud Run Info</h3>
+                    <p><strong>Domain:</strong> {{ original_host }}</p>
+                    <p><strong>Protocol:</strong> {{ original_protocol }}</p>
+                    <p><strong>Mapping:</strong> <span class="status-badge status-success">Enabled</span></p>
+                </div>
+            </div>
+
+            <div style="text-align: center; margin: 30px 0;">
+                <button class="refresh-btn" onclick="location.reload()">
+                    🔄 Refresh Data
+                </button>
+            </div>
+        </div>
+
+        <div class="footer">
+            <p><strong>Yourl.Cloud</strong> - Secure URL API Server with Visual Inspection</p>
+            <p>Session: {{ session_id }} | Organization: {{ organization }}</p>
+        </div>
+    </div>
+
+    <script>
+        // Auto-refresh every 30 seconds
+        setTimeout(function() {
+            location.reload();
+        }, 30000);
+    </script>
+</body>
+</html>
+"""
+
+# One shared environment for the whole process: templates never change at
+# runtime, so skip the reload check and never evict compiled templates.
+# DictLoader names have no .html extension, so autoescape is forced on for all.
+_TEMPLATES = Environment(
+    loader=ChoiceLoader([
+        DictLoader({
+            'visual': _VISUAL_HTML,
+        }),
+        FileSystemLoader(os.path.join(app.root_path, 'templates')),
+    ]),
+    autoescape=select_autoescape(default_for_string=True, default=True),
+    auto_reload=False,
+    cache_size=-1,
+    # Compiled file templates survive worker restarts (system temp dir)
+    bytecode_cache=FileSystemBytecodeCache()
+)
+_TEMPLATES.globals['url_for'] = url_for
+_TEMPLATES.globals['asset_version'] = _ASSET_VERSION
+# Guard values are fixed at startup, so templates get them as constants
+_TEMPLATES.globals['session_id'] = FRIENDS_FAMILY_GUARD['session_id']
+_TEMPLATES.globals['session_id_short'] = _SESSION_ID_SHORT
+_TEMPLATES.globals['organization'] = FRIENDS_FAMILY_GUARD['organization']
+
+# Display format for data stream frame timestamps (local time)
+_TS_FMT = "%Y-%m-%d %H:%M:%S"
+
+_DATA_STREAM_TMPL = _TEMPLATES.get_template('data_stream.html.j2')
+
+# Rendered landing pages for anonymous visitors (no visitor cookie, no session),
+# keyed by (marketing password, host, protocol) so a rotation invalidates them
+_LANDING_TTL = 30.0  # seconds
+_LANDING_CACHE_MAX = 64  # forwarded hosts are client-supplied, so keep it bounded
+_landing_cache = {}
+_landing_lock = threading.Lock()
+
+def _render_landing_page(current_password, visitor_data=None):
+    """
+    Render the landing page body for the current request. Without
+    visitor_data the page carries nothing visitor-specific, so it is safe
+    to share between anonymous visitors.
+    """
+    if _INDEX_EXISTS:
+        return render_template('index.html',
+                               marketing_code=current_password,
+                               visitor_data=visitor_data)
+    # Host and protocol come from X-Forwarded-* headers and the body is shared
+    # through _landing_cache, so escape them like any visitor-supplied value
+    return _fill_template(_INDEX_FALLBACK_PARTS,
+                          escape(g.original_host),
+                          escape(g.original_protocol),
+                          escape(current_password))
+
+def _cached_landing_page(current_password):
+    """
+    Return the anonymous landing page body, rendering it at most once per
+    _LANDING_TTL for each (password, host, protocol). The shared copy is
+    rendered without visitor data so no visitor's details leak into it.
+    """
+    key = (current_password, g.original_host, g.original_protocol)
+    ts, body = _landing_cache.get(key, (0.0, None))
+    if body is not None and time.monotonic() - ts < _LANDING_TTL:
+        return body
+    
+    with _landing_lock:
+        # Another thread may have rendered it while we waited
+        ts, body = _landing_cache.get(key, (0.0, None))
+        if body is not None and time.monotonic() - ts < _LANDING_TTL:
+            return body
+        body = _render_landing_page(current_password)
+        if len(_landing_cache) >= _LANDING_CACHE_MAX:
+            _landing_cache.clear()
+        _landing_cache[key] = (time.monotonic(), body)
+        return body
+
+def _set_visitor_cookie(response):
+    """
+    Give the client a visitor_id cookie if it does not already have one.
+    """
+    if not request.cookies.get('visitor_id'):
+        visitor_id = uuid.uuid4().hex
+        response.set_cookie('visitor_id', visitor_id, max_age=365*24*60*60)  # 1 year
+
+@app.route('/', methods=['GET', 'POST'])
+def main_endpoint():
+    """
+    Main endpoint that handles both GET (landing page) and POST (authentication).
+    Compatible with Cloud Run domain mappings with visitor tracking.
+    """
+    if request.method == 'GET':
+        # Get current marketing password
+        current_password = get_current_marketing_password()
+        
+        # Anonymous visitors all see the same page; returning visitors get a
+        # personalized render with their visitor information
+        if request.cookies.get('visitor_id') or session.get('authenticated'):
+            body = _render_landing_page(current_password, get_visitor_data())
+        else:
+            body = _cached_landing_page(current_password)
+        
+        # Create response with no-cache headers to ensure fresh content
+        response = Response(body, mimetype='text/html')
         
         # Add cache control headers to prevent browser caching
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
@@ -555,7 +1272,16 @@ def main_endpoint():
         password = request.form.get('password', '')
         current_password = get_current_marketing_password()
         
-        if password == current_password:
+        # Proxy headers resolved once for the whole request
+        host = g.original_host
+        proto = g.original_protocol
+        client_ip = g.client_ip
+        user_agent = g.user_agent
+        base = f"{proto}://{host}"
+        landing_url = f"{base}/"
+        
+        # Constant-time compare; bytes so non-ASCII input cannot raise
+        if current_password and hmac.compare_digest(password.encode(), current_password.encode()):
             # Set session-based authentication (for when database is not available)
             session['authenticated'] = True
             session['last_access_code'] = current_password
@@ -564,35 +1290,24 @@ def main_endpoint():
             next_password = get_next_marketing_password()
             
             # Log successful authentication to database if available
-            try:
-                database_connection = os.environ.get('DATABASE_CONNECTION_STRING')
-                if database_connection:
-                    from scripts.database_client import DatabaseClient
-                    db_client = DatabaseClient(database_connection)
-                    
-                    # Log usage
-                    db_client.log_usage(current_password, request.headers.get('User-Agent'), 
-                                      get_client_ip(), '/auth', True)
-                    
-                    # Log visitor access
-                    visitor_id = request.cookies.get('visitor_id')
-                    if visitor_id:
-                        db_client.log_visitor_access(
-                            visitor_id=visitor_id,
-                            access_code=current_password,
-                            success=True,
-                            user_agent=request.headers.get('User-Agent'),
-                            ip_address=get_client_ip()
-                        )
-            except Exception as e:
-                print(f"⚠️ Database logging failed: {e}")
+            if _DB:
+                # Log usage
+                _queue_db_write('log_usage', current_password, user_agent, client_ip, '/auth', True)
+                
+                # Log visitor access
+                visitor_id = request.cookies.get('visitor_id')
+                if visitor_id:
+                    _queue_db_write(
+                        'log_visitor_access',
+                        visitor_id=visitor_id,
+                        access_code=current_password,
+                        success=True,
+                        user_agent=user_agent,
+                        ip_address=client_ip
+                    )
             
             # Get current build version/commit hash
-            try:
-                build_version = subprocess.check_output(['git', 'rev-parse', 'HEAD'], 
-                                                     text=True, stderr=subprocess.DEVNULL).strip()[:8]
-            except:
-                build_version = "unknown"
+            build_version = _GIT_COMMIT_HASH or "unknown"
             
             # Get visitor data for personalization
             visitor_data = get_visitor_data()
@@ -600,26 +1315,22 @@ def main_endpoint():
             
             # Store landing page version in SQL if database is available
             landing_page_version = None
-            try:
-                database_connection = os.environ.get('DATABASE_CONNECTION_STRING')
-                if database_connection:
-                    from scripts.database_client import DatabaseClient
-                    db_client = DatabaseClient(database_connection)
-                    
-                    # Store landing page version
-                    landing_page_url = f"{get_original_protocol()}://{get_original_host()}/"
-                    db_client.store_landing_page_version(
-                        visitor_id=visitor_id,
-                        landing_page_url=landing_page_url,
-                        build_version=build_version,
-                        marketing_code=current_password
-                    )
-                    
+            if _DB:
+                # Store landing page version
+                _queue_db_write(
+                    'store_landing_page_version',
+                    visitor_id=visitor_id,
+                    landing_page_url=landing_url,
+                    build_version=build_version,
+                    marketing_code=current_password
+                )
+                
+                try:
                     # Get visitor's landing page history for personalization
-                    landing_page_version = db_client.get_landing_page_version(visitor_id)
-            except Exception as e:
-                print(f"⚠️ Database logging failed: {e}")
-                landing_page_version = None
+                    landing_page_version = _DB.get_landing_page_version(visitor_id)
+                except Exception as e:
+                    logger.warning("Database logging failed: %s", e)
+                    landing_page_version = None
             
             # Create personalized response based on visitor data
             is_new_visitor = visitor_data.get('is_new_visitor', True)
@@ -638,8 +1349,8 @@ def main_endpoint():
                 experience_level = "returning_visitor"
             
             # Create JSON response with actual URL and personalized data
-            json_response = {
-                "status": "authenticated",
+            json_response = _RESPONSE_SKELETON.copy()
+            json_response.update({
                 "message": welcome_message,
                 "experience_level": experience_level,
                 "visitor_data": {
@@ -650,24 +1361,19 @@ def main_endpoint():
                     "tracking_key": visitor_data.get('tracking_key')
                 },
                 "landing_page": {
-                    "url": f"{get_original_protocol()}://{get_original_host()}/",
+                    "url": landing_url,
                     "build_version": build_version,
                     "marketing_code": current_password
                 },
                 "current_marketing_password": current_password,
                 "next_marketing_password": next_password,
-                "ownership": {
-                    "perplexity": "current_marketing_password",
-                    "cursor": "next_marketing_password"
-                },
                 "navigation": {
-                    "back_to_landing": f"{get_original_protocol()}://{get_original_host()}/",
-                    "api_endpoint": f"{get_original_protocol()}://{get_original_host()}/api",
-                    "status_page": f"{get_original_protocol()}://{get_original_host()}/status"
+                    "back_to_landing": landing_url,
+                    "api_endpoint": f"{base}/api",
+                    "status_page": f"{base}/status"
                 },
-                "timestamp": datetime.utcnow().isoformat(),
-                "organization": FRIENDS_FAMILY_GUARD["organization"]
-            }
+                "timestamp": _iso_now()
+            })
             
             # Add landing page version history if available
             if landing_page_version:
@@ -678,308 +1384,27 @@ def main_endpoint():
                     "previous_url": landing_page_version.get('landing_page_url')
                 }
             
+            # API clients that prefer JSON get the response data directly,
+            # without formatting the HTML page below
+            if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+                response = jsonify(json_response)
+                _set_visitor_cookie(response)
+                return response
+            
             # Create comprehensive HTML page for public searchable representation
-            html_content = f"""
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Yourl.Cloud Inc. - Cloud Infrastructure & API Services</title>
-                <meta name="description" content="Yourl.Cloud Inc. provides cloud infrastructure, API services, and digital solutions. Based in the United States, serving global clients with secure, scalable technology solutions.">
-                <meta name="keywords" content="cloud infrastructure, API services, digital solutions, technology, Yourl.Cloud, United States">
-                <meta name="author" content="Yourl.Cloud Inc.">
-                <meta name="robots" content="index, follow">
-                <meta property="og:title" content="Yourl.Cloud Inc. - Cloud Infrastructure & API Services">
-                <meta property="og:description" content="Secure, scalable cloud infrastructure and API services for modern businesses.">
-                <meta property="og:type" content="website">
-                <meta property="og:url" content="https://yourl.cloud">
-                <meta property="og:site_name" content="Yourl.Cloud Inc.">
-                <link rel="canonical" href="https://yourl.cloud">
-                
-                <style>
-                    * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-                    body {{ 
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        line-height: 1.6;
-                        color: #333;
-                        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                        min-height: 100vh;
-                    }}
-                    .container {{ 
-                        max-width: 1200px; 
-                        margin: 0 auto; 
-                        padding: 20px;
-                        background: rgba(255, 255, 255, 0.95);
-                        border-radius: 15px;
-                        box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                        margin-top: 20px;
-                        margin-bottom: 20px;
-                    }}
-                    .header {{ 
-                        text-align: center; 
-                        padding: 40px 0;
-                        border-bottom: 3px solid #667eea;
-                        margin-bottom: 30px;
-                    }}
-                    .logo {{ 
-                        font-size: 3rem; 
-                        font-weight: bold; 
-                        color: #667eea;
-                        margin-bottom: 10px;
-                    }}
-                    .tagline {{ 
-                        font-size: 1.2rem; 
-                        color: #666;
-                        margin-bottom: 20px;
-                    }}
-                    .success-banner {{ 
-                        background: linear-gradient(45deg, #28a745, #20c997);
-                        color: white;
-                        padding: 20px;
-                        border-radius: 10px;
-                        margin-bottom: 30px;
-                        text-align: center;
-                    }}
-                    .visitor-info {{ 
-                        background: #f8f9fa;
-                        padding: 20px;
-                        border-radius: 10px;
-                        margin-bottom: 30px;
-                        border-left: 5px solid #667eea;
-                    }}
-                    .experience-level {{
-                        display: inline-block;
-                        padding: 5px 15px;
-                        border-radius: 20px;
-                        font-size: 0.9rem;
-                        font-weight: bold;
-                        margin-bottom: 10px;
-                    }}
-                    .new-user {{ background: #28a745; color: white; }}
-                    .returning-user {{ background: #ffc107; color: #333; }}
-                    .returning-visitor {{ background: #17a2b8; color: white; }}
-                    
-                    .company-info {{ 
-                        display: grid;
-                        grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
-                        gap: 30px;
-                        margin-bottom: 30px;
-                    }}
-                    .info-card {{ 
-                        background: white;
-                        padding: 25px;
-                        border-radius: 10px;
-                        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-                        border-top: 4px solid #667eea;
-                    }}
-                    .info-card h3 {{ 
-                        color: #667eea;
-                        margin-bottom: 15px;
-                        font-size: 1.3rem;
-                    }}
-                    .services {{ 
-                        background: #f8f9fa;
-                        padding: 30px;
-                        border-radius: 10px;
-                        margin-bottom: 30px;
-                    }}
-                    .services h2 {{ 
-                        color: #667eea;
-                        margin-bottom: 20px;
-                        text-align: center;
-                    }}
-                    .service-grid {{ 
-                        display: grid;
-                        grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                        gap: 20px;
-                    }}
-                    .service-item {{ 
-                        background: white;
-                        padding: 20px;
-                        border-radius: 8px;
-                        box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-                        text-align: center;
-                    }}
-                    .service-item h4 {{ 
-                        color: #667eea;
-                        margin-bottom: 10px;
-                    }}
-                    .navigation {{ 
-                        text-align: center;
-                        margin-top: 30px;
-                        padding-top: 30px;
-                        border-top: 2px solid #eee;
-                    }}
-                    .nav-btn {{ 
-                        display: inline-block;
-                        background: #667eea;
-                        color: white;
-                        padding: 12px 25px;
-                        text-decoration: none;
-                        border-radius: 25px;
-                        margin: 10px;
-                        transition: all 0.3s ease;
-                        font-weight: bold;
-                    }}
-                    .nav-btn:hover {{ 
-                        background: #5a6fd8;
-                        transform: translateY(-2px);
-                        box-shadow: 0 5px 15px rgba(0,0,0,0.2);
-                    }}
-                    .footer {{ 
-                        text-align: center;
-                        padding: 30px 0;
-                        color: #666;
-                        border-top: 2px solid #eee;
-                        margin-top: 30px;
-                    }}
-                    .privilege-badge {{
-                        display: inline-block;
-                        background: #ff6b6b;
-                        color: white;
-                        padding: 5px 12px;
-                        border-radius: 15px;
-                        font-size: 0.8rem;
-                        margin: 5px;
-                    }}
-                    .affiliation-section {{
-                        background: linear-gradient(45deg, #ff6b6b, #ee5a24);
-                        color: white;
-                        padding: 20px;
-                        border-radius: 10px;
-                        margin: 20px 0;
-                    }}
-                    @media (max-width: 768px) {{
-                        .container {{ margin: 10px; padding: 15px; }}
-                        .logo {{ font-size: 2rem; }}
-                        .company-info {{ grid-template-columns: 1fr; }}
-                        .service-grid {{ grid-template-columns: 1fr; }}
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <!-- Header with Company Identity -->
-                    <div class="header">
-                        <div class="logo">Yourl.Cloud Inc.</div>
-                        <div class="tagline">Secure Cloud Infrastructure & API Services</div>
-                        <p>United States • Global Operations • Enterprise Solutions</p>
-                    </div>
-
-                    <!-- Success Banner for Authenticated Users -->
-                    <div class="success-banner">
-                        <h2>🎉 Welcome to Yourl.Cloud Inc.</h2>
-                        <p><strong>Authentication Successful</strong> - You now have access to our enhanced services.</p>
-                        <p>Experience Level: <span class="experience-level {experience_level}">{experience_level.replace('_', ' ').title()}</span></p>
-                    </div>
-
-                    <!-- Visitor Information Section -->
-                    <div class="visitor-info">
-                        <h3>👤 Your Visitor Profile</h3>
-                        <p><strong>Visitor ID:</strong> {visitor_data.get('visitor_id', 'Unknown')}</p>
-                        <p><strong>Total Visits:</strong> {visitor_data.get('total_visits', 1)}</p>
-                        <p><strong>Status:</strong> {'New Visitor' if visitor_data.get('is_new_visitor', True) else 'Returning Visitor'}</p>
-                        <p><strong>Code Usage:</strong> {'Has used access codes' if visitor_data.get('has_used_code', False) else 'First time using codes'}</p>
-                        {f'<p><strong>Tracking Key:</strong> {visitor_data.get("tracking_key")}</p>' if visitor_data.get('tracking_key') else ''}
-                    </div>
-
-                    <!-- Company Information for SEO -->
-                    <div class="company-info">
-                        <div class="info-card">
-                            <h3>🏢 About Yourl.Cloud Inc.</h3>
-                            <p>Yourl.Cloud Inc. is a leading technology company specializing in cloud infrastructure, API services, and digital solutions. Based in the United States, we serve clients globally with secure, scalable, and innovative technology solutions.</p>
-                            <p><strong>Founded:</strong> 2024</p>
-                            <p><strong>Headquarters:</strong> United States</p>
-                            <p><strong>Industry:</strong> Cloud Computing, API Services, Digital Infrastructure</p>
-                        </div>
-                        
-                        <div class="info-card">
-                            <h3>🌐 Global Operations</h3>
-                            <p>Operating from the United States, Yourl.Cloud Inc. provides services to clients worldwide. Our infrastructure spans multiple regions, ensuring reliable, low-latency access to our services.</p>
-                            <p><strong>Primary Region:</strong> US-West1 (Google Cloud)</p>
-                            <p><strong>Service Availability:</strong> 24/7 Global Access</p>
-                            <p><strong>Compliance:</strong> US-based data centers</p>
-                        </div>
-                        
-                        <div class="info-card">
-                            <h3>🔒 Security & Compliance</h3>
-                            <p>Yourl.Cloud Inc. maintains the highest standards of security and compliance. Our infrastructure is built on Google Cloud Platform, ensuring enterprise-grade security, reliability, and performance.</p>
-                            <p><strong>Infrastructure:</strong> Google Cloud Platform</p>
-                            <p><strong>Security:</strong> Enterprise-grade encryption</p>
-                            <p><strong>Compliance:</strong> Industry-standard protocols</p>
-                        </div>
-                    </div>
-
-                    <!-- Services Section -->
-                    <div class="services">
-                        <h2>🚀 Our Services</h2>
-                        <div class="service-grid">
-                            <div class="service-item">
-                                <h4>☁️ Cloud Infrastructure</h4>
-                                <p>Scalable cloud solutions built on Google Cloud Platform, providing reliable and secure infrastructure for modern applications.</p>
-                            </div>
-                            <div class="service-item">
-                                <h4>🔌 API Services</h4>
-                                <p>RESTful API services with comprehensive documentation, authentication, and monitoring capabilities.</p>
-                            </div>
-                            <div class="service-item">
-                                <h4>🛡️ Security Solutions</h4>
-                                <p>Enterprise-grade security with encryption, authentication, and compliance features for sensitive data handling.</p>
-                            </div>
-                            <div class="service-item">
-                                <h4>📊 Analytics & Monitoring</h4>
-                                <p>Real-time monitoring, analytics, and insights to optimize performance and user experience.</p>
-                            </div>
-                        </div>
-                    </div>
-
-                    <!-- Privileges & Affiliations Section -->
-                    <div class="affiliation-section">
-                        <h3>🎯 Your Privileges & Affiliations</h3>
-                        <p>Based on your authentication and visit history, you have access to the following privileges:</p>
-                        
-                        <div class="privilege-badge">✅ Authenticated User</div>
-                        <div class="privilege-badge">✅ API Access</div>
-                        <div class="privilege-badge">✅ Service Monitoring</div>
-                        <div class="privilege-badge">✅ Technical Support</div>
-                        
-                        {f'<div class="privilege-badge">✅ Returning Customer</div>' if not visitor_data.get('is_new_visitor', True) else ''}
-                        {f'<div class="privilege-badge">✅ Code History Access</div>' if visitor_data.get('has_used_code', False) else ''}
-                        
-                        <p style="margin-top: 15px;"><strong>Access Level:</strong> {experience_level.replace('_', ' ').title()}</p>
-                        <p><strong>Build Version:</strong> {build_version}</p>
-                        <p><strong>Current Marketing Code:</strong> {current_password}</p>
-                    </div>
-
-                                                    <!-- Navigation -->
-                                <div class="navigation">
-                                    <a href="/" class="nav-btn">🏠 Back to Landing Page</a>
-                                    <a href="/data" class="nav-btn">📊 Data Stream</a>
-                                    <a href="/api" class="nav-btn">🔌 API Documentation</a>
-                                    <a href="/status" class="nav-btn">📊 Service Status</a>
-                                    <a href="/health" class="nav-btn">❤️ Health Check</a>
-                                </div>
-
-                    <!-- Footer with Legal Information -->
-                    <div class="footer">
-                        <p><strong>Yourl.Cloud Inc.</strong> - Cloud Infrastructure & API Services</p>
-                        <p>United States • Global Operations • Enterprise Solutions</p>
-                        <p>© 2024 Yourl.Cloud Inc. All rights reserved.</p>
-                        <p>Built on Google Cloud Platform • Secure • Scalable • Reliable</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
+            parts = _auth_ok_parts(visitor_data, experience_level,
+                                   build_version, current_password)
             
-            response = make_response(html_content)
+            # Body is already UTF-8 bytes; hand it over without re-encoding
+            if request.accept_encodings['gzip']:
+                response = Response(_gzip_parts(parts), mimetype='text/html')
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = Response(b"".join(parts), mimetype='text/html')
+            response.vary.add('Accept-Encoding')
             
             # Set visitor cookie if not already set
-            if not request.cookies.get('visitor_id'):
-                import uuid
-                visitor_id = str(uuid.uuid4())
-                response.set_cookie('visitor_id', visitor_id, max_age=365*24*60*60)  # 1 year
+            _set_visitor_cookie(response)
             
             return response
         else:
@@ -988,64 +1413,29 @@ def main_endpoint():
             session.pop('last_access_code', None)
             
             # Log failed authentication attempt to database if available
-            try:
-                database_connection = os.environ.get('DATABASE_CONNECTION_STRING')
-                if database_connection:
-                    from scripts.database_client import DatabaseClient
-                    db_client = DatabaseClient(database_connection)
-                    
-                    # Log usage
-                    db_client.log_usage(current_password, request.headers.get('User-Agent'), 
-                                      get_client_ip(), '/auth', False)
-                    
-                    # Log visitor access
-                    visitor_id = request.cookies.get('visitor_id')
-                    if visitor_id:
-                        db_client.log_visitor_access(
-                            visitor_id=visitor_id,
-                            access_code=password,  # Log the attempted code
-                            success=False,
-                            user_agent=request.headers.get('User-Agent'),
-                            ip_address=get_client_ip()
-                        )
-            except Exception as e:
-                print(f"⚠️ Database logging failed: {e}")
+            if _DB:
+                # Log usage
+                _queue_db_write('log_usage', current_password, user_agent, client_ip, '/auth', False)
+                
+                # Log visitor access
+                visitor_id = request.cookies.get('visitor_id')
+                if visitor_id:
+                    _queue_db_write(
+                        'log_visitor_access',
+                        visitor_id=visitor_id,
+                        access_code=password,  # Log the attempted code
+                        success=False,
+                        user_agent=user_agent,
+                        ip_address=client_ip
+                    )
             
             # Create response with visitor cookie
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Access Denied - Yourl.Cloud</title>
-                <meta charset="utf-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; text-align: center; }}
-                    .container {{ max-width: 400px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    h1 {{ color: #d32f2f; }}
-                    .btn {{ background: #007bff; color: white; padding: 10px 20px; text-decoration: none; border-radius: 5px; display: inline-block; margin-top: 20px; }}
-                    .password-hint {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 10px; border-radius: 5px; margin: 10px 0; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>❌ Access Denied</h1>
-                    <p>Invalid marketing password. Please try again.</p>
-                    <div class="password-hint">
-                        <strong>💡 Hint:</strong> The current marketing password is: {current_password}
-                    </div>
-                    <a href="/" class="btn">🔄 Try Again</a>
-                </div>
-            </body>
-            </html>
-            """
+            html_content = _AUTH_DENIED_TMPL.substitute(current_password=escape(current_password))
             
             response = make_response(html_content)
             
             # Set visitor cookie if not already set
-            if not request.cookies.get('visitor_id'):
-                import uuid
-                visitor_id = str(uuid.uuid4())
-                response.set_cookie('visitor_id', visitor_id, max_age=365*24*60*60)  # 1 year
+            _set_visitor_cookie(response)
             
             return response
     
@@ -1061,19 +1451,17 @@ def get_request_url():
     # Get request information with Cloud Run header support
     url = request.url
     method = request.method
-    headers = dict(request.headers)
-    user_agent = headers.get('User-Agent', 'Unknown')
-    device_type = detect_device_type(user_agent)
+    device_type = g.device_type  # detected from the User-Agent in _cache_request_info
     
     # Get Cloud Run specific information
-    client_ip = get_client_ip()
-    original_host = get_original_host()
-    original_protocol = get_original_protocol()
+    client_ip = g.client_ip
+    original_host = g.original_host
+    original_protocol = g.original_protocol
     
     # Check if visual inspection is allowed
     if is_visual_inspection_allowed(device_type):
         # Return HTML for allowed devices
-        return render_visual_inspection(url, device_type, datetime.utcnow(), original_host, original_protocol)
+        return render_visual_inspection(url, device_type, _utc_now(), original_host, original_protocol)
     else:
         # Return JSON for blocked devices (like watches)
         return jsonify({
@@ -1081,7 +1469,7 @@ def get_request_url():
             "method": method,
             "device_type": device_type,
             "visual_inspection": "blocked",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _iso_now(),
             "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
             "organization": FRIENDS_FAMILY_GUARD["organization"],
             "cloud_run": {
@@ -1097,214 +1485,90 @@ def render_visual_inspection(url, device_type, timestamp, original_host, origina
     Render the visual inspection interface for allowed devices.
     Enhanced for Cloud Run domain mapping compatibility.
     """
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Yourl.Cloud - Visual Inspection</title>
-        <style>
-            body {{
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                margin: 0;
-                padding: 20px;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                color: #333;
-            }}
-            .container {{
-                max-width: 800px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 15px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                overflow: hidden;
-            }}
-            .header {{
-                background: linear-gradient(135deg, #007bff, #0056b3);
-                color: white;
-                padding: 30px;
-                text-align: center;
-            }}
-            .header h1 {{
-                margin: 0;
-                font-size: 2.5em;
-                font-weight: 300;
-            }}
-            .content {{
-                padding: 30px;
-            }}
-            .url-display {{
-                background: #f8f9fa;
-                border: 2px solid #e9ecef;
-                border-radius: 10px;
-                padding: 20px;
-                margin: 20px 0;
-                word-break: break-all;
-                font-family: 'Courier New', monospace;
-                font-size: 14px;
-            }}
-            .info-grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
-                gap: 20px;
-                margin: 30px 0;
-            }}
-            .info-card {{
-                background: #f8f9fa;
-                border-radius: 10px;
-                padding: 20px;
-                border-left: 4px solid #007bff;
-            }}
-            .info-card h3 {{
-                margin: 0 0 10px 0;
-                color: #007bff;
-            }}
-            .status-badge {{
-                display: inline-block;
-                padding: 5px 15px;
-                border-radius: 20px;
-                font-size: 12px;
-                font-weight: bold;
-                text-transform: uppercase;
-            }}
-            .status-success {{
-                background: #d4edda;
-                color: #155724;
-            }}
-            .status-info {{
-                background: #d1ecf1;
-                color: #0c5460;
-            }}
-            .refresh-btn {{
-                background: linear-gradient(135deg, #007bff, #0056b3);
-                color: white;
-                border: none;
-                padding: 12px 30px;
-                border-radius: 25px;
-                cursor: pointer;
-                font-size: 16px;
-                transition: transform 0.2s;
-            }}
-            .refresh-btn:hover {{
-                transform: translateY(-2px);
-            }}
-            .footer {{
-                background: #f8f9fa;
-                padding: 20px;
-                text-align: center;
-                border-top: 1px solid #e9ecef;
-            }}
-            @media (max-width: 768px) {{
-                .container {{
-                    margin: 10px;
-                    border-radius: 10px;
-                }}
-                .header h1 {{
-                    font-size: 2em;
-                }}
-                .content {{
-                    padding: 20px;
-                }}
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🔍 Visual Inspection</h1>
-                <p>Yourl.Cloud URL API Server - Real-time Monitoring</p>
-            </div>
-            
-            <div class="content">
-                <div class="url-display">
-                    <strong>Request URL:</strong><br>
-                    {url}
-                </div>
-                
-                <div class="info-grid">
-                    <div class="info-card">
-                        <h3>📱 Device Information</h3>
-                        <p><strong>Type:</strong> {device_type.title()}</p>
-                        <p><strong>Status:</strong> <span class="status-badge status-success">Allowed</span></p>
-                    </div>
-                    
-                    <div class="info-card">
-                        <h3>🛡️ Security Status</h3>
-                        <p><strong>Guard:</strong> <span class="status-badge status-success">Enabled</span></p>
-                        <p><strong>Inspection:</strong> <span class="status-badge status-info">Active</span></p>
-                    </div>
-                    
-                    <div class="info-card">
-                        <h3>⏰ Timestamp</h3>
-                        <p><strong>Time:</strong> {timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
-                        <p><strong>Session:</strong> {FRIENDS_FAMILY_GUARD['session_id'][:8]}...</p>
-                    </div>
-                    
-                    <div class="info-card">
-                        <h3>🏢 Organization</h3>
-                        <p><strong>Company:</strong> {FRIENDS_FAMILY_GUARD['organization']}</p>
-                        <p><strong>Environment:</strong> <span class="status-badge status-success">Production</span></p>
-                    </div>
-                    
-                    <div class="info-card">
-                        <h3>☁️ Cloud Run Info</h3>
-                        <p><strong>Domain:</strong> {original_host}</p>
-                        <p><strong>Protocol:</strong> {original_protocol}</p>
-                        <p><strong>Mapping:</strong> <span class="status-badge status-success">Enabled</span></p>
-                    </div>
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <button class="refresh-btn" onclick="location.reload()">
-                        🔄 Refresh Data
-                    </button>
-                </div>
-            </div>
-            
-            <div class="footer">
-                <p><strong>Yourl.Cloud</strong> - Secure URL API Server with Visual Inspection</p>
-                <p>Session: {FRIENDS_FAMILY_GUARD['session_id']} | Organization: {FRIENDS_FAMILY_GUARD['organization']}</p>
-            </div>
-        </div>
-        
-        <script>
-            // Auto-refresh every 30 seconds
-            setTimeout(function() {{
-                location.reload();
-            }}, 30000);
-        </script>
-    </body>
-    </html>
-    """
+    html_content = _TEMPLATES.get_template('visual').render(
+        url=url,
+        device_type=device_type,
+        timestamp=timestamp,
+        original_host=original_host,
+        original_protocol=original_protocol
+    )
     return html_content
 
+def _json_prefix(static_fields):
+    """
+    Serialize the fields that never change as an unterminated JSON object,
+    ready to have the per-request members appended by _json_body().
+    """
+    return json.dumps(static_fields, separators=(',', ':'))[:-1].encode()
+
+def _json_body(prefix, **dynamic_fields):
+    """
+    Complete a _json_prefix() object with the per-request fields.
+    """
+    return prefix + b',' + _dumps_bytes(dynamic_fields)[1:]
+
+_HEALTH_PREFIX = _json_prefix({
+    "status": "healthy",
+    "service": "url-api",
+    "version": "1.0.0",
+    "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
+    "cloud_run_support": True,
+    "domain_mapping": {
+        "enabled": CLOUD_RUN_CONFIG["domain_mapping_enabled"],
+        "region": CLOUD_RUN_CONFIG["region"],
+        "health_check_path": CLOUD_RUN_CONFIG["health_check_path"]
+    },
+    "wsgi_server": "waitress" if _IS_WINDOWS else "gunicorn",
+    "production_mode": True,
+    "deployment_model": "all_instances_production",
+    "port": PORT
+})
+
+_STATUS_PREFIX = _json_prefix({
+    "service": "URL API with Visual Inspection",
+    "version": "1.0.0",
+    "status": "running",
+    "port": PORT,
+    "session_id": FRIENDS_FAMILY_GUARD["session_id"],
+    "organization": FRIENDS_FAMILY_GUARD["organization"],
+    "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
+    "visual_inspection": FRIENDS_FAMILY_GUARD["visual_inspection"],
+    "cloud_run_support": True,
+    "demo_mode": True,
+    "wsgi_server": "waitress" if _IS_WINDOWS else "gunicorn",
+    "production_mode": True,
+    "deployment_model": "all_instances_production"
+})
+
+_GUARD_PREFIX = _json_prefix({
+    "friends_family_guard": FRIENDS_FAMILY_GUARD
+})
+
+# Last /health body as (monotonic time, host, protocol, bytes); probes arrive
+# every few seconds, so it is reused for up to _HEALTH_TTL seconds
+_HEALTH_TTL = 1.0
+_health_cache = (float('-inf'), None, None, b'')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint for Cloud Run domain mapping compatibility.
     This endpoint is used by Cloud Run for health checks and domain mapping validation.
     """
-    return jsonify({
-        "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
-        "service": "url-api",
-        "version": "1.0.0",
-        "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
-        "cloud_run_support": True,
-        "domain_mapping": {
-            "enabled": CLOUD_RUN_CONFIG["domain_mapping_enabled"],
-            "region": CLOUD_RUN_CONFIG["region"],
-            "health_check_path": CLOUD_RUN_CONFIG["health_check_path"]
-        },
-        "wsgi_server": "waitress" if platform.system() == "Windows" else "gunicorn",
-        "production_mode": True,
-        "deployment_model": "all_instances_production",
-        "port": PORT,
-        "host": get_original_host(),
-        "protocol": get_original_protocol()
-    })
+    global _health_cache
+    now = time.monotonic()
+    cached_at, host, protocol, body = _health_cache
+    if (now - cached_at >= _HEALTH_TTL or host != g.original_host
+            or protocol != g.original_protocol):
+        body = _json_body(_HEALTH_PREFIX,
+                          timestamp=_iso_now(),
+                          host=g.original_host,
+                          protocol=g.original_protocol)
+        _health_cache = (now, g.original_host, g.original_protocol, body)
+    
+    response = Response(body, mimetype='application/json')
+    response.headers['Cache-Control'] = 'public, max-age=1'
+    return response
 
 @app.route('/status', methods=['GET'])
 def status():
@@ -1312,40 +1576,246 @@ def status():
     Status endpoint with service information.
     Enhanced for Cloud Run domain mapping compatibility.
     """
-    return jsonify({
-        "service": "URL API with Visual Inspection",
-        "version": "1.0.0",
-        "status": "running",
-        "port": PORT,
-        "host": get_original_host(),
-        "timestamp": datetime.utcnow().isoformat(),
-        "session_id": FRIENDS_FAMILY_GUARD["session_id"],
-        "organization": FRIENDS_FAMILY_GUARD["organization"],
-        "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
-        "visual_inspection": FRIENDS_FAMILY_GUARD["visual_inspection"],
-        "cloud_run_support": True,
-        "demo_mode": True,
-        "wsgi_server": "waitress" if platform.system() == "Windows" else "gunicorn",
-        "production_mode": True,
-        "deployment_model": "all_instances_production",
-        "domain_mapping": {
-            "enabled": CLOUD_RUN_CONFIG["domain_mapping_enabled"],
-            "region": CLOUD_RUN_CONFIG["region"],
-            "original_host": get_original_host(),
-            "original_protocol": get_original_protocol(),
-            "client_ip": get_client_ip()
-        }
-    })
+    body = _json_body(_STATUS_PREFIX,
+                      host=g.original_host,
+                      timestamp=_iso_now(),
+                      domain_mapping={
+                          "enabled": CLOUD_RUN_CONFIG["domain_mapping_enabled"],
+                          "region": CLOUD_RUN_CONFIG["region"],
+                          "original_host": g.original_host,
+                          "original_protocol": g.original_protocol,
+                          "client_ip": g.client_ip
+                      })
+    return Response(body, mimetype='application/json')
 
 @app.route('/guard', methods=['GET'])
 def guard_status():
     """
     Friends and Family Guard status endpoint.
     """
-    return jsonify({
-        "friends_family_guard": FRIENDS_FAMILY_GUARD,
-        "timestamp": datetime.utcnow().isoformat()
-    })
+    body = _json_body(_GUARD_PREFIX, timestamp=_iso_now())
+    return Response(body, mimetype='application/json')
+
+def _mind_map_html(nodes):
+    """
+    Mind map node buttons for a sequence of node names.
+    """
+    return Markup("".join(
+        f'<div class="mind-map-node" onclick="filterByNode(\'{escape(node)}\')">'
+        f'{escape(node.replace("_", " ").title())}</div>'
+        for node in nodes
+    ))
+
+def _freeze_frame(frame):
+    """
+    Pre-render the escaped HTML pieces of a data stream frame and freeze it.
+    Frames marked "personalized" keep their content as a Markup format
+    string whose fields are escaped when filled in per request.
+    """
+    frozen = dict(frame)
+    frozen['mind_map_nodes'] = tuple(frame['mind_map_nodes'])
+    frozen['nodes_attr'] = escape(','.join(frame['mind_map_nodes']))
+    frozen['category_html'] = escape(frame['category'].replace('_', ' ').title())
+    frozen['title_html'] = escape(frame['title'])
+    frozen['content'] = Markup(frame['content']) if frame.get('personalized') else escape(frame['content'])
+    frozen['visual_elements_html'] = Markup('').join(
+        Markup('<span class="visual-element">{}</span>').format(element.replace('_', ' ').title())
+        for element in frame['visual_elements']
+    )
+    frozen['wiki_links_html'] = Markup('').join(
+        Markup('<a href="/wiki/{}" class="wiki-link" target="_blank">📚 {}</a>').format(
+            link, link.replace('.md', '').replace('_', ' ').title())
+        for link in frame['wiki_links']
+    )
+    return types.MappingProxyType(frozen)
+
+# Data stream story frames with wiki interpretations. Only the timestamp
+# ("offset" seconds from the request time) and the personalized sentences
+# change per request; everything else is escaped once here.
+_BASE_FRAMES = tuple(_freeze_frame(frame) for frame in (
+    {
+        "id": "frame_001",
+        "offset": -3600,  # 1 hour ago
+        "title": "The Digital Frontier",
+        "content": "In the vast expanse of the digital realm, Yourl.Cloud Inc. emerged as a beacon of innovation. The story begins with a simple idea: to bridge the gap between human potential and technological possibility.",
+        "category": "origin_story",
+        "visual_elements": ["mountain_peak", "digital_landscape", "beacon_light"],
+        "scroll_position": 0,
+        "wiki_links": ["ARCHITECTURE_OVERVIEW.md", "Home.md"],
+        "mind_map_nodes": ["business", "technology", "innovation"]
+    },
+    {
+        "id": "frame_002",
+        "offset": -1800,  # 30 minutes ago
+        "title": "The Code That Speaks",
+        "content": "Every line of code tells a story. In the depths of the API, algorithms dance with data, creating symphonies of information that power the modern world. This is where magic meets mathematics.",
+        "category": "technical_evolution",
+        "visual_elements": ["code_stream", "algorithm_flow", "data_symphony"],
+        "scroll_position": 100,
+        "wiki_links": ["SECRET_MANAGER_INTEGRATION.md", "COST_EFFECTIVE_MARKETING_CODES.md"],
+        "mind_map_nodes": ["code", "algorithms", "data"]
+    },
+    {
+        "id": "frame_003",
+        "offset": -900,  # 15 minutes ago
+        "title": "The Visitor's Journey",
+        "content": "Visitor {visitor_id} embarked on a digital pilgrimage. Their path through the virtual landscape reveals patterns of human-computer interaction that shape the future of technology.",
+        "personalized": True,
+        "category": "user_experience",
+        "visual_elements": ["digital_path", "interaction_patterns", "future_vision"],
+        "scroll_position": 200,
+        "wiki_links": ["WIKI_UPDATE_SYSTEM.md", "STATUS.md"],
+        "mind_map_nodes": ["user", "experience", "interaction"]
+    },
+    {
+        "id": "frame_004",
+        "offset": -300,  # 5 minutes ago
+        "title": "The Cloud's Whisper",
+        "content": "In the silent halls of Google Cloud, servers hum with purpose. Each request, each response, each authentication creates ripples in the digital fabric that connects us all.",
+        "category": "infrastructure",
+        "visual_elements": ["server_halls", "digital_ripples", "connection_web"],
+        "scroll_position": 300,
+        "wiki_links": ["CLOUD_RUN_DOMAIN_MAPPING.md", "DEPLOYMENT_SUMMARY.md"],
+        "mind_map_nodes": ["cloud", "infrastructure", "servers"]
+    },
+    {
+        "id": "frame_005",
+        "offset": 0,
+        "title": "The Present Moment",
+        "content": "Here and now, in this exact moment, technology and humanity converge. The story continues to unfold, written in real-time by every interaction, every decision, every digital breath.",
+        "category": "current_state",
+        "visual_elements": ["convergence_point", "real_time_story", "digital_breath"],
+        "scroll_position": 400,
+        "wiki_links": ["KNOWLEDGE_HUB.md", "ARCHITECTURE_OVERVIEW.md"],
+        "mind_map_nodes": ["present", "convergence", "real-time"]
+    }
+))
+
+# Shown to visitors who have authenticated before
+_PERSONAL_FRAME = _freeze_frame({
+    "id": "frame_personal",
+    "offset": 60,
+    "title": "The Authenticated Path",
+    "content": "This visitor has walked the path of authentication. Their journey through the digital landscape has granted them access to deeper layers of the story, revealing secrets hidden in plain sight.",
+    "category": "personal_privilege",
+    "visual_elements": ["authenticated_path", "hidden_secrets", "deeper_layers"],
+    "scroll_position": 500,
+    "wiki_links": ["SECURITY.md", "SECURITY_CHECKLIST.md"],
+    "mind_map_nodes": ["authentication", "security", "access"]
+})
+
+# Shown to visitors with more than one visit
+_RETURNING_FRAME = _freeze_frame({
+    "id": "frame_returning",
+    "offset": 120,
+    "title": "The Returning Wanderer",
+    "content": "Like a traveler returning to familiar lands, this visitor has walked these digital paths before. Their {total_visits} visits have woven them into the fabric of this digital story.",
+    "personalized": True,
+    "category": "returning_visitor",
+    "visual_elements": ["familiar_lands", "woven_fabric", "digital_story"],
+    "scroll_position": 600,
+    "wiki_links": ["WIKI_UPDATE_SUMMARY.md", "BETA_LAUNCH_SUMMARY.md"],
+    "mind_map_nodes": ["returning", "familiarity", "history"]
+})
+
+_KNOWLEDGE_FRAME = _freeze_frame({
+    "id": "frame_knowledge",
+    "offset": 180,
+    "title": "The Knowledge Hub",
+    "content": "At the heart of this digital ecosystem lies the Knowledge Hub - a comprehensive repository of wisdom, experience, and insights that guides every decision and shapes every interaction.",
+    "category": "knowledge_management",
+    "visual_elements": ["knowledge_hub", "wisdom_repository", "insight_ecosystem"],
+    "scroll_position": 700,
+    "wiki_links": ["KNOWLEDGE_HUB.md", "WIKI_UPDATE_SYSTEM.md"],
+    "mind_map_nodes": ["knowledge", "wisdom", "insights"]
+})
+
+@functools.lru_cache(maxsize=4)
+def _frame_set(has_code, returning):
+    """
+    Frames, distinct category count and mind map markup for one combination
+    of the optional personal/returning frames.
+    """
+    frames = _BASE_FRAMES
+    if has_code:
+        frames += (_PERSONAL_FRAME,)
+    if returning:
+        frames += (_RETURNING_FRAME,)
+    frames += (_KNOWLEDGE_FRAME,)
+    category_count = len({frame['category'] for frame in frames})
+    nodes = [node for frame in frames for node in frame['mind_map_nodes']]
+    return frames, category_count, _mind_map_html(nodes)
+
+# 403 page for /data; only the visitor id is filled in per request
+# (braces in the CSS are doubled for str.format)
+_ACCESS_DENIED_HTML = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Access Denied - Data Stream</title>
+    <style>
+        body {{ 
+            font-family: 'Courier New', monospace;
+            background: #000;
+            color: #ff0000;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            min-height: 100vh;
+            margin: 0;
+        }}
+        .access-denied {{
+            text-align: center;
+            padding: 40px;
+            border: 2px solid #ff0000;
+            border-radius: 10px;
+            background: rgba(255, 0, 0, 0.1);
+        }}
+        .error-code {{
+            font-size: 3rem;
+            margin-bottom: 20px;
+            text-shadow: 0 0 20px #ff0000;
+        }}
+        .message {{
+            font-size: 1.2rem;
+            margin-bottom: 30px;
+        }}
+        .nav-btn {{
+            display: inline-block;
+            padding: 10px 20px;
+            background: #ff0000;
+            color: #000;
+            text-decoration: none;
+            border-radius: 5px;
+            font-weight: bold;
+            margin: 10px;
+        }}
+        .nav-btn:hover {{
+            background: #cc0000;
+            color: #fff;
+        }}
+    </style>
+</head>
+<body>
+    <div class="access-denied">
+        <div class="error-code">🔒 ACCESS DENIED</div>
+        <div class="message">
+            <p><strong>Data Stream Access Restricted</strong></p>
+            <p>This endpoint is only accessible to authenticated users.</p>
+            <p>You must first use a valid marketing code on the landing page.</p>
+            <p>Visitor ID: {visitor_id}</p>
+            <p>Authentication Status: Not Authenticated</p>
+        </div>
+        <div>
+            <a href="/" class="nav-btn">🏠 Return to Landing Page</a>
+            <a href="/status" class="nav-btn">📊 Service Status</a>
+        </div>
+    </div>
+</body>
+</html>
+"""
 
 @app.route('/data', methods=['GET'])
 def data_stream():
@@ -1359,518 +1829,52 @@ def data_stream():
     
     # Check if visitor has authenticated (used a valid code previously)
     if not visitor_data.get('has_used_code', False):
-        return make_response(f"""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Access Denied - Data Stream</title>
-            <style>
-                body {{ 
-                    font-family: 'Courier New', monospace;
-                    background: #000;
-                    color: #ff0000;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                    min-height: 100vh;
-                    margin: 0;
-                }}
-                .access-denied {{
-                    text-align: center;
-                    padding: 40px;
-                    border: 2px solid #ff0000;
-                    border-radius: 10px;
-                    background: rgba(255, 0, 0, 0.1);
-                }}
-                .error-code {{
-                    font-size: 3rem;
-                    margin-bottom: 20px;
-                    text-shadow: 0 0 20px #ff0000;
-                }}
-                .message {{
-                    font-size: 1.2rem;
-                    margin-bottom: 30px;
-                }}
-                .nav-btn {{
-                    display: inline-block;
-                    padding: 10px 20px;
-                    background: #ff0000;
-                    color: #000;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    font-weight: bold;
-                    margin: 10px;
-                }}
-                .nav-btn:hover {{
-                    background: #cc0000;
-                    color: #fff;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="access-denied">
-                <div class="error-code">🔒 ACCESS DENIED</div>
-                <div class="message">
-                    <p><strong>Data Stream Access Restricted</strong></p>
-                    <p>This endpoint is only accessible to authenticated users.</p>
-                    <p>You must first use a valid marketing code on the landing page.</p>
-                    <p>Visitor ID: {visitor_data.get('visitor_id', 'Unknown')}</p>
-                    <p>Authentication Status: Not Authenticated</p>
-                </div>
-                <div>
-                    <a href="/" class="nav-btn">🏠 Return to Landing Page</a>
-                    <a href="/status" class="nav-btn">📊 Service Status</a>
-                </div>
-            </div>
-        </body>
-        </html>
-        """, 403)
-    
-    # Generate dynamic story frames based on current time and visitor data
-    import time
-    current_time = time.time()
+        return make_response(_ACCESS_DENIED_HTML.format(
+            visitor_id=escape(visitor_data.get('visitor_id', 'Unknown'))), 403)
     
-    # Create comprehensive story frames with wiki interpretations
-    story_frames = [
-        {
-            "id": "frame_001",
-            "timestamp": current_time - 3600,  # 1 hour ago
-            "title": "The Digital Frontier",
-            "content": "In the vast expanse of the digital realm, Yourl.Cloud Inc. emerged as a beacon of innovation. The story begins with a simple idea: to bridge the gap between human potential and technological possibility.",
-            "category": "origin_story",
-            "visual_elements": ["mountain_peak", "digital_landscape", "beacon_light"],
-            "scroll_position": 0,
-            "wiki_links": ["ARCHITECTURE_OVERVIEW.md", "Home.md"],
-            "mind_map_nodes": ["business", "technology", "innovation"]
-        },
-        {
-            "id": "frame_002", 
-            "timestamp": current_time - 1800,  # 30 minutes ago
-            "title": "The Code That Speaks",
-            "content": "Every line of code tells a story. In the depths of the API, algorithms dance with data, creating symphonies of information that power the modern world. This is where magic meets mathematics.",
-            "category": "technical_evolution",
-            "visual_elements": ["code_stream", "algorithm_flow", "data_symphony"],
-            "scroll_position": 100,
-            "wiki_links": ["SECRET_MANAGER_INTEGRATION.md", "COST_EFFECTIVE_MARKETING_CODES.md"],
-            "mind_map_nodes": ["code", "algorithms", "data"]
-        },
-        {
-            "id": "frame_003",
-            "timestamp": current_time - 900,  # 15 minutes ago
-            "title": "The Visitor's Journey",
-            "content": f"Visitor {visitor_data.get('visitor_id', 'Unknown')} embarked on a digital pilgrimage. Their path through the virtual landscape reveals patterns of human-computer interaction that shape the future of technology.",
-            "category": "user_experience",
-            "visual_elements": ["digital_path", "interaction_patterns", "future_vision"],
-            "scroll_position": 200,
-            "wiki_links": ["WIKI_UPDATE_SYSTEM.md", "STATUS.md"],
-            "mind_map_nodes": ["user", "experience", "interaction"]
-        },
-        {
-            "id": "frame_004",
-            "timestamp": current_time - 300,  # 5 minutes ago
-            "title": "The Cloud's Whisper",
-            "content": "In the silent halls of Google Cloud, servers hum with purpose. Each request, each response, each authentication creates ripples in the digital fabric that connects us all.",
-            "category": "infrastructure",
-            "visual_elements": ["server_halls", "digital_ripples", "connection_web"],
-            "scroll_position": 300,
-            "wiki_links": ["CLOUD_RUN_DOMAIN_MAPPING.md", "DEPLOYMENT_SUMMARY.md"],
-            "mind_map_nodes": ["cloud", "infrastructure", "servers"]
-        },
-        {
-            "id": "frame_005",
-            "timestamp": current_time,
-            "title": "The Present Moment",
-            "content": "Here and now, in this exact moment, technology and humanity converge. The story continues to unfold, written in real-time by every interaction, every decision, every digital breath.",
-            "category": "current_state",
-            "visual_elements": ["convergence_point", "real_time_story", "digital_breath"],
-            "scroll_position": 400,
-            "wiki_links": ["KNOWLEDGE_HUB.md", "ARCHITECTURE_OVERVIEW.md"],
-            "mind_map_nodes": ["present", "convergence", "real-time"]
-        }
-    ]
+    # Pick the frozen frame set for this visitor; only timestamps and the
+    # personalized sentences are produced per request
+    has_code = bool(visitor_data.get('has_used_code', False))
+    returning = visitor_data.get('total_visits', 1) > 1
+    frames, category_count, mind_map_nodes_html = _frame_set(has_code, returning)
     
-    # Add personalized frames based on visitor data
-    if visitor_data.get('has_used_code', False):
-        story_frames.append({
-            "id": "frame_personal",
-            "timestamp": current_time + 60,
-            "title": "The Authenticated Path",
-            "content": f"This visitor has walked the path of authentication. Their journey through the digital landscape has granted them access to deeper layers of the story, revealing secrets hidden in plain sight.",
-            "category": "personal_privilege",
-            "visual_elements": ["authenticated_path", "hidden_secrets", "deeper_layers"],
-            "scroll_position": 500,
-            "wiki_links": ["SECURITY.md", "SECURITY_CHECKLIST.md"],
-            "mind_map_nodes": ["authentication", "security", "access"]
-        })
-    
-    if visitor_data.get('total_visits', 1) > 1:
-        story_frames.append({
-            "id": "frame_returning",
-            "timestamp": current_time + 120,
-            "title": "The Returning Wanderer",
-            "content": f"Like a traveler returning to familiar lands, this visitor has walked these digital paths before. Their {visitor_data.get('total_visits', 1)} visits have woven them into the fabric of this digital story.",
-            "category": "returning_visitor",
-            "visual_elements": ["familiar_lands", "woven_fabric", "digital_story"],
-            "scroll_position": 600,
-            "wiki_links": ["WIKI_UPDATE_SUMMARY.md", "BETA_LAUNCH_SUMMARY.md"],
-            "mind_map_nodes": ["returning", "familiarity", "history"]
-        })
-    
-    # Add knowledge hub frame
-    story_frames.append({
-        "id": "frame_knowledge",
-        "timestamp": current_time + 180,
-        "title": "The Knowledge Hub",
-        "content": "At the heart of this digital ecosystem lies the Knowledge Hub - a comprehensive repository of wisdom, experience, and insights that guides every decision and shapes every interaction.",
-        "category": "knowledge_management",
-        "visual_elements": ["knowledge_hub", "wisdom_repository", "insight_ecosystem"],
-        "scroll_position": 700,
-        "wiki_links": ["KNOWLEDGE_HUB.md", "WIKI_UPDATE_SYSTEM.md"],
-        "mind_map_nodes": ["knowledge", "wisdom", "insights"]
-    })
-    
-    # Create the enhanced HTML response with vertical datastream and mind map
-    # Generate mind map nodes HTML
-    mind_map_nodes_html = ""
-    for frame in story_frames:
-        for node in frame.get('mind_map_nodes', []):
-            mind_map_nodes_html += f'<div class="mind-map-node" onclick="filterByNode(\'{node}\')">{node.replace("_", " ").title()}</div>'
+    current_time = time.time()
+    fields = {
+        'visitor_id': visitor_data.get('visitor_id', 'Unknown'),
+        'total_visits': visitor_data.get('total_visits', 1)
+    }
+    story_frames = []
+    for frame in frames:
+        content = frame['content']
+        if frame.get('personalized'):
+            content = content.format(**fields)
+        story_frames.append((
+            frame,
+            time.strftime(_TS_FMT, time.localtime(current_time + frame['offset'])),
+            content
+        ))
     
-    html_content = f"""
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Data Stream - Yourl.Cloud Inc.</title>
-        <style>
-            * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-            body {{ 
-                font-family: 'Courier New', monospace;
-                background: #000;
-                color: #00ff00;
-                overflow-x: auto;
-                overflow-y: hidden;
-            }}
-            .datastream-container {{
-                display: flex;
-                flex-direction: column;
-                min-height: 100vh;
-                width: max-content;
-                padding: 20px;
-            }}
-            .frame {{
-                width: 800px;
-                min-height: 300px;
-                margin: 20px 0;
-                padding: 30px;
-                background: rgba(0, 255, 0, 0.05);
-                border: 1px solid #00ff00;
-                border-radius: 10px;
-                position: relative;
-                overflow: hidden;
-                transition: all 0.3s ease;
-            }}
-            .frame::before {{
-                content: '';
-                position: absolute;
-                top: 0;
-                left: 0;
-                right: 0;
-                height: 2px;
-                background: linear-gradient(90deg, #00ff00, #00aa00, #00ff00);
-                animation: pulse 2s infinite;
-            }}
-            @keyframes pulse {{
-                0% {{ opacity: 0.5; }}
-                50% {{ opacity: 1; }}
-                100% {{ opacity: 0.5; }}
-            }}
-            .frame:hover {{
-                background: rgba(0, 255, 0, 0.1);
-                transform: scale(1.02);
-                box-shadow: 0 0 20px rgba(0, 255, 0, 0.3);
-            }}
-            .frame-header {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin-bottom: 15px;
-                padding-bottom: 10px;
-                border-bottom: 1px solid rgba(0, 255, 0, 0.3);
-            }}
-            .frame-id {{
-                font-weight: bold;
-                color: #00aa00;
-            }}
-            .frame-timestamp {{
-                font-size: 0.9rem;
-                color: #00aa00;
-            }}
-            .frame-category {{
-                display: inline-block;
-                padding: 5px 10px;
-                background: rgba(0, 255, 0, 0.2);
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.8rem;
-                margin-bottom: 10px;
-            }}
-            .frame-title {{
-                font-size: 1.5rem;
-                font-weight: bold;
-                margin-bottom: 15px;
-                color: #00ff00;
-            }}
-            .frame-content {{
-                line-height: 1.6;
-                margin-bottom: 20px;
-            }}
-            .visual-elements {{
-                display: flex;
-                flex-wrap: wrap;
-                gap: 10px;
-                margin-bottom: 15px;
-            }}
-            .visual-element {{
-                padding: 5px 10px;
-                background: rgba(0, 255, 0, 0.2);
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.8rem;
-            }}
-            .wiki-links {{
-                display: flex;
-                flex-wrap: wrap;
-                gap: 10px;
-                margin-top: 15px;
-                padding-top: 15px;
-                border-top: 1px solid rgba(0, 255, 0, 0.3);
-            }}
-            .wiki-link {{
-                padding: 5px 10px;
-                background: rgba(0, 255, 0, 0.1);
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.8rem;
-                text-decoration: none;
-                color: #00ff00;
-                transition: all 0.3s ease;
-            }}
-            .wiki-link:hover {{
-                background: rgba(0, 255, 0, 0.3);
-                transform: scale(1.05);
-            }}
-            .mind-map {{
-                position: fixed;
-                top: 20px;
-                right: 20px;
-                width: 300px;
-                height: 400px;
-                background: rgba(0, 0, 0, 0.9);
-                border: 1px solid #00ff00;
-                border-radius: 10px;
-                padding: 15px;
-                z-index: 1000;
-            }}
-            .mind-map-title {{
-                text-align: center;
-                font-size: 1.2rem;
-                margin-bottom: 15px;
-                color: #00ff00;
-            }}
-            .mind-map-node {{
-                display: inline-block;
-                padding: 5px 10px;
-                background: rgba(0, 255, 0, 0.2);
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.8rem;
-                margin: 5px;
-                cursor: pointer;
-                transition: all 0.3s ease;
-            }}
-            .mind-map-node:hover {{
-                background: rgba(0, 255, 0, 0.4);
-                transform: scale(1.1);
-            }}
-            .scroll-indicator {{
-                position: fixed;
-                top: 20px;
-                left: 20px;
-                background: rgba(0, 0, 0, 0.8);
-                padding: 10px;
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.9rem;
-            }}
-            .navigation {{
-                position: fixed;
-                bottom: 20px;
-                left: 50%;
-                transform: translateX(-50%);
-                display: flex;
-                gap: 10px;
-            }}
-            .nav-btn {{
-                padding: 10px 20px;
-                background: #00ff00;
-                color: #000;
-                text-decoration: none;
-                border-radius: 5px;
-                font-weight: bold;
-                transition: all 0.3s ease;
-            }}
-            .nav-btn:hover {{
-                background: #00aa00;
-                color: #fff;
-                transform: scale(1.05);
-            }}
-            .visitor-info {{
-                position: fixed;
-                top: 20px;
-                left: 20px;
-                background: rgba(0, 0, 0, 0.8);
-                padding: 15px;
-                border: 1px solid #00ff00;
-                border-radius: 5px;
-                font-size: 0.9rem;
-            }}
-            .data-stream-title {{
-                text-align: center;
-                font-size: 2rem;
-                margin-bottom: 30px;
-                color: #00ff00;
-                text-shadow: 0 0 20px #00ff00;
-            }}
-            .mind-map-container {{
-                display: flex;
-                flex-wrap: wrap;
-                justify-content: center;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="visitor-info">
-            <h3>👤 Visitor Data</h3>
-            <p><strong>ID:</strong> {visitor_data.get('visitor_id', 'Unknown')}</p>
-            <p><strong>Visits:</strong> {visitor_data.get('total_visits', 1)}</p>
-            <p><strong>Status:</strong> {'Returning' if not visitor_data.get('is_new_visitor', True) else 'New'}</p>
-            <p><strong>Code Usage:</strong> {'Yes' if visitor_data.get('has_used_code', False) else 'No'}</p>
-        </div>
-        
-        <div class="mind-map">
-            <div class="mind-map-title">🧠 Mind Map</div>
-            <div class="mind-map-container">
-                {mind_map_nodes_html}
-            </div>
-        </div>
-        
-        <div class="scroll-indicator">
-            <p><strong>Scroll Position:</strong> <span id="scrollPos">0</span></p>
-            <p><strong>Frames:</strong> {len(story_frames)}</p>
-            <p><strong>Categories:</strong> {len(set(frame['category'] for frame in story_frames))}</p>
-        </div>
-        
-        <div class="datastream-container">
-            <div class="data-stream-title">📊 VERTICAL LINEAR DATASTREAM</div>
-            
-            {''.join([f'''
-            <div class="frame" data-scroll="{frame['scroll_position']}" data-category="{frame['category']}" data-nodes="{','.join(frame.get('mind_map_nodes', []))}">
-                <div class="frame-header">
-                    <span class="frame-id">{frame['id']}</span>
-                    <span class="frame-timestamp">{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(frame['timestamp']))}</span>
-                </div>
-                <div class="frame-category">{frame['category'].replace('_', ' ').title()}</div>
-                <div class="frame-title">{frame['title']}</div>
-                <div class="frame-content">{frame['content']}</div>
-                <div class="visual-elements">
-                    {''.join([f'<span class="visual-element">{element.replace("_", " ").title()}</span>' for element in frame['visual_elements']])}
-                </div>
-                <div class="wiki-links">
-                    {''.join([f'<a href="/wiki/{link}" class="wiki-link" target="_blank">📚 {link.replace(".md", "").replace("_", " ").title()}</a>' for link in frame.get('wiki_links', [])])}
-                </div>
-            </div>
-            ''' for frame in story_frames])}
-        </div>
-        
-        <div class="navigation">
-            <a href="/" class="nav-btn">🏠 Home</a>
-            <a href="/api" class="nav-btn">🔌 API</a>
-            <a href="/status" class="nav-btn">📊 Status</a>
-            <a href="/wiki/KNOWLEDGE_HUB.md" class="nav-btn" target="_blank">🧠 Knowledge Hub</a>
-        </div>
-        
-        <script>
-            // Update scroll position indicator
-            window.addEventListener('scroll', function() {{
-                document.getElementById('scrollPos').textContent = Math.round(window.scrollY);
-            }});
-            
-            // Add hover effects to frames
-            document.querySelectorAll('.frame').forEach(frame => {{
-                frame.addEventListener('mouseenter', function() {{
-                    this.style.background = 'rgba(0, 255, 0, 0.1)';
-                    this.style.transform = 'scale(1.02)';
-                }});
-                
-                frame.addEventListener('mouseleave', function() {{
-                    this.style.background = 'rgba(0, 255, 0, 0.05)';
-                    this.style.transform = 'scale(1)';
-                }});
-            }});
-            
-            // Mind map filtering
-            function filterByNode(node) {{
-                const frames = document.querySelectorAll('.frame');
-                frames.forEach(frame => {{
-                    const nodes = frame.dataset.nodes.split(',');
-                    if (nodes.includes(node)) {{
-                        frame.style.display = 'block';
-                        frame.style.opacity = '1';
-                    }} else {{
-                        frame.style.opacity = '0.3';
-                    }}
-                }});
-            }}
-            
-            // Auto-scroll animation
-            let scrollSpeed = 0.5;
-            function autoScroll() {{
-                window.scrollBy(0, scrollSpeed);
-                requestAnimationFrame(autoScroll);
-            }}
-            
-            // Start auto-scroll after 3 seconds
-            setTimeout(() => {{
-                autoScroll();
-            }}, 3000);
-            
-            // Add keyboard navigation
-            document.addEventListener('keydown', function(e) {{
-                switch(e.key) {{
-                    case 'ArrowUp':
-                        window.scrollBy(0, -100);
-                        break;
-                    case 'ArrowDown':
-                        window.scrollBy(0, 100);
-                        break;
-                    case 'Home':
-                        window.scrollTo(0, 0);
-                        break;
-                    case 'End':
-                        window.scrollTo(0, document.body.scrollHeight);
-                        break;
-                }}
-            }});
-        </script>
-    </body>
-    </html>
-    """
+    # Stream the vertical datastream and mind map from the precompiled template;
+    # the request context is kept alive because the template calls url_for
+    html_stream = _DATA_STREAM_TMPL.stream(frames=story_frames, visitor=visitor_data,
+                                           mind_map_nodes_html=mind_map_nodes_html,
+                                           category_count=category_count)
+    html_stream.enable_buffering(8)
     
-    return make_response(html_content)
+    return Response(stream_with_context(html_stream), mimetype='text/html')
+
+# Static parts of the error payloads, serialized once; handlers append the
+# per-request fields with _json_body()
+_NOT_FOUND_PREFIX = _json_prefix({
+    "error": "Not Found",
+    "message": "The requested resource was not found, but here's your request URL",
+    "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"]
+})
+_SERVER_ERROR_PREFIX = _json_prefix({
+    "error": "Internal Server Error",
+    "message": "An internal server error occurred",
+    "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"]
+})
 
 @app.errorhandler(404)
 def not_found(error):
@@ -1878,48 +1882,39 @@ def not_found(error):
     Handle 404 errors by returning the request URL.
     Compatible with Cloud Run domain mappings.
     """
-    return jsonify({
-        "error": "Not Found",
-        "url": request.url,
-        "message": "The requested resource was not found, but here's your request URL",
-        "timestamp": datetime.utcnow().isoformat(),
-        "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"],
-        "cloud_run": {
-            "original_host": get_original_host(),
-            "original_protocol": get_original_protocol()
-        }
-    }), 404
+    # Static-file misses skip the before_request hook, so fall back to the headers
+    body = _json_body(_NOT_FOUND_PREFIX,
+                      url=request.url,
+                      timestamp=_iso_now(),
+                      cloud_run={
+                          "original_host": g.get('original_host') or get_original_host(),
+                          "original_protocol": g.get('original_protocol') or get_original_protocol()
+                      })
+    return Response(body, status=404, mimetype='application/json')
 
 @app.errorhandler(500)
 def internal_error(error):
     """
     Handle 500 errors.
     """
-    logger.error(f"Internal server error: {str(error)}")
-    return jsonify({
-        "error": "Internal Server Error",
-        "url": request.url,
-        "message": "An internal server error occurred",
-        "timestamp": datetime.utcnow().isoformat(),
-        "friends_family_guard": FRIENDS_FAMILY_GUARD["enabled"]
-    }), 500
+    logger.error("Internal server error: %s", error)
+    body = _json_body(_SERVER_ERROR_PREFIX, url=request.url, timestamp=_iso_now())
+    return Response(body, status=500, mimetype='application/json')
 
 def launch_browser(url, delay=1.5):
     """
     Launch the default browser to the specified URL after a short delay.
     This allows the server to start up before the browser tries to connect.
     """
-    def _launch():
-        time.sleep(delay)  # Wait for server to start
-        try:
-            webbrowser.open(url)
-            print(f"🌐 Browser launched: {url}")
-        except Exception as e:
-            print(f"⚠️ Could not launch browser: {e}")
-    
-    # Launch browser in a separate thread to avoid blocking
-    browser_thread = threading.Thread(target=_launch, daemon=True)
-    browser_thread.start()
+    # A detached helper process rather than a thread: on Unix the server
+    # replaces this process with Gunicorn (execvp), which would kill a thread
+    script = (f"import time, webbrowser; time.sleep({delay!r}); "
+              f"print('🌐 Browser launched: ' + {url!r}) if webbrowser.open({url!r}) "
+              f"else print('⚠️ Could not launch browser')")
+    try:
+        subprocess.Popen([sys.executable, '-c', script], start_new_session=True)
+    except Exception as e:
+        print(f"⚠️ Could not launch browser: {e}")
 
 def start_production_server():
     """
@@ -1928,57 +1923,55 @@ def start_production_server():
     """
     print("🚀 Starting production WSGI server...")
     
-    if platform.system() == "Windows":
+    if _IS_WINDOWS:
         # Use Waitress on Windows
         try:
             import waitress
-            print("✅ Using Waitress WSGI server (Windows)")
-            # Suppress Waitress logging messages
-            import logging
-            logging.getLogger('waitress').setLevel(logging.ERROR)
-            waitress.serve(app, host=HOST, port=PORT, threads=4, connection_limit=1000)
         except ImportError:
-            print("❌ Waitress not found. Installing...")
-            try:
-                subprocess.run([sys.executable, "-m", "pip", "install", "waitress"], check=True)
-                import waitress
-                print("✅ Waitress installed - starting production server...")
-                # Suppress Waitress logging messages
-                import logging
-                logging.getLogger('waitress').setLevel(logging.ERROR)
-                waitress.serve(app, host=HOST, port=PORT, threads=4, connection_limit=1000)
-            except Exception as e:
-                print(f"❌ Failed to install/use Waitress: {e}")
-                print("🔄 Falling back to Flask development server...")
-                app.run(host=HOST, port=PORT, debug=False, threaded=True)
+            raise RuntimeError("waitress not installed; add to requirements.txt")
+        print("✅ Using Waitress WSGI server (Windows)")
+        # Thread pool scales with the vCPUs; WAITRESS_THREADS overrides it
+        waitress_threads = int(os.environ.get('WAITRESS_THREADS') or max(8, (os.cpu_count() or 1) * 4))
+        waitress.serve(app, host=HOST, port=PORT, threads=waitress_threads, connection_limit=1000,
+                       channel_timeout=30, cleanup_interval=30)
     else:
         # Use Gunicorn on Unix-like systems
         try:
             import gunicorn
-            print("✅ Using Gunicorn WSGI server (Unix)")
-            cmd = ["gunicorn", "--bind", f"{HOST}:{PORT}", "--workers", "4", "app:app"]
-            subprocess.run(cmd, check=True)
         except ImportError:
-            print("❌ Gunicorn not found. Installing...")
+            print("❌ Gunicorn not found - falling back to a minimal Waitress server...")
             try:
-                subprocess.run([sys.executable, "-m", "pip", "install", "gunicorn"], check=True)
-                import gunicorn
-                print("✅ Gunicorn installed - starting production server...")
-                cmd = ["gunicorn", "--bind", f"{HOST}:{PORT}", "--workers", "4", "app:app"]
-                subprocess.run(cmd, check=True)
-            except Exception as e:
-                print(f"❌ Failed to install/use Gunicorn: {e}")
-                print("🔄 Falling back to Flask development server...")
-                app.run(host=HOST, port=PORT, debug=False, threaded=True)
+                import waitress
+            except ImportError:
+                raise RuntimeError("gunicorn not installed; add to requirements.txt")
+            # Bounded thread pool instead of the Flask dev server's thread-per-request
+            waitress.serve(app, host=HOST, port=PORT, threads=2, connection_limit=100)
+            return
+        print("✅ Using Gunicorn WSGI server (Unix)")
+        # Threaded workers overlap the Secret Manager/database round-trips.
+        # No --preload: each worker must import the app itself, because the
+        # gRPC Secret Manager client created at import is not fork-safe.
+        cmd = ["gunicorn", "--bind", f"{HOST}:{PORT}",
+               "--workers", "2", "--threads", "8", "--worker-class", "gthread",
+               "--max-requests", "1000", "--max-requests-jitter", "100"]
+        # Compact access log; set GUNICORN_ACCESS_LOG=/dev/null to drop it entirely
+        cmd += ["--access-logfile", os.environ.get('GUNICORN_ACCESS_LOG', '-'),
+                "--access-logformat", '%(h)s "%(r)s" %(s)s %(M)sms']
+        # Keep worker heartbeat files on tmpfs; overlayfs on Cloud Run can stall them
+        if os.path.isdir('/dev/shm'):
+            cmd += ["--worker-tmp-dir", "/dev/shm"]
+        cmd.append("app:app")
+        # Replace this process with Gunicorn so no idle parent is left behind
+        # and SIGTERM from Cloud Run reaches the arbiter directly.
+        os.execvp(cmd[0], cmd)
 
-def attempt_code_recovery(visitor_id: str, user_agent: str, ip_address: str) -> dict:
+def attempt_code_recovery(visitor_id: str) -> dict:
     """
     Attempt to recover user experience based on their usage patterns.
     This respects privacy by using only stored behavioral data.
     """
     try:
-        database_connection = os.environ.get('DATABASE_CONNECTION_STRING')
-        if not database_connection:
+        if not _DB:
             # Fallback: suggest current live code when database is not available
             current_code = get_current_marketing_password()
             return {
@@ -1994,11 +1987,8 @@ def attempt_code_recovery(visitor_id: str, user_agent: str, ip_address: str) ->
                 }
             }
         
-        from scripts.database_client import DatabaseClient
-        db_client = DatabaseClient(database_connection)
-        
-        # Get visitor's access history
-        visitor_history = db_client.get_visitor_access_history(visitor_id)
+        # Get visitor's access history from the shared client
+        visitor_history = _DB.get_visitor_access_history(visitor_id)
         
         if not visitor_history:
             # No history found - suggest current code
@@ -2016,18 +2006,25 @@ def attempt_code_recovery(visitor_id: str, user_agent: str, ip_address: str) ->
                 }
             }
         
-        # Analyze patterns to suggest recovery
-        successful_codes = [h['access_code'] for h in visitor_history if h.get('success')]
-        recent_codes = [h['access_code'] for h in visitor_history[-5:]]  # Last 5 attempts
+        # Analyze patterns in one pass: only the latest attempt, the latest
+        # success and the number of successes are needed
+        last_attempt = visitor_history[-1]['access_code']
+        last_success = None
+        successful_count = 0
+        for h in reversed(visitor_history):
+            if h.get('success'):
+                successful_count += 1
+                if last_success is None:
+                    last_success = h['access_code']
         
-        if successful_codes:
+        if last_success is not None:
             # User has successfully used codes before - suggest the most recent successful one
-            suggested_code = successful_codes[-1]
+            suggested_code = last_success
             recovery_method = 'previous_success'
             message = f"Based on your previous successful usage, try: {suggested_code}"
-        elif recent_codes:
+        elif last_attempt is not None:
             # User has attempted codes recently - suggest the most recent attempt
-            suggested_code = recent_codes[-1]
+            suggested_code = last_attempt
             recovery_method = 'recent_attempt'
             message = f"Based on your recent activity, you may have tried: {suggested_code}"
         else:
@@ -2043,14 +2040,14 @@ def attempt_code_recovery(visitor_id: str, user_agent: str, ip_address: str) ->
             'recovery_method': recovery_method,
             'usage_pattern': {
                 'total_attempts': len(visitor_history),
-                'successful_attempts': len(successful_codes),
-                'last_successful': successful_codes[-1] if successful_codes else None,
-                'last_attempt': recent_codes[-1] if recent_codes else None
+                'successful_attempts': successful_count,
+                'last_successful': last_success,
+                'last_attempt': last_attempt
             }
         }
         
     except Exception as e:
-        print(f"⚠️ Error in code recovery: {e}")
+        logger.warning("Error in code recovery: %s", e)
         # Fallback: suggest current code on any error
         current_code = get_current_marketing_password()
         return {
@@ -2060,275 +2057,340 @@ def attempt_code_recovery(visitor_id: str, user_agent: str, ip_address: str) ->
             'recovery_method': 'current_code_error_fallback'
         }
 
-@app.route('/recover', methods=['GET', 'POST'])
+# Recovery pages, built once at import; only the success and failure pages
+# have per-request fields
+_RECOVER_FORM_HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Code Recovery - Yourl.Cloud</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+        .container { max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; text-align: center; }
+        .form-group { margin: 20px 0; }
+        label { display: block; margin-bottom: 5px; font-weight: bold; }
+        input[type="text"] { width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; }
+        button { background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }
+        button:hover { background: #0056b3; }
+        .info { background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }
+        .recovery-message { background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0; }
+        .privacy-note { background: #f8f9fa; padding: 10px; border-radius: 5px; margin: 20px 0; font-size: 14px; color: #666; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🔐 Code Recovery</h1>
+        <div class="info">
+            <strong>Forgot your Yourl code?</strong><br>
+            Don't worry! We can help you recover your experience based on your previous usage patterns.
+        </div>
+
+        <form method="POST">
+            <div class="form-group">
+                <label for="recovery_method">Recovery Method:</label>
+                <select name="recovery_method" id="recovery_method" style="width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;">
+                    <option value="auto">🤖 Automatic Recovery (Recommended)</option>
+                    <option value="manual">✍️ Manual Recovery</option>
+                </select>
+            </div>
+
+            <div class="form-group">
+                <label for="visitor_id">Visitor ID (if you remember it):</label>
+                <input type="text" id="visitor_id" name="visitor_id" placeholder="Leave blank for automatic detection">
+            </div>
+
+            <button type="submit">🔍 Recover My Experience</button>
+        </form>
+
+        <div class="privacy-note">
+            <strong>🔒 Privacy First:</strong> This recovery system uses only your stored behavioral data (codes you've used before, visit patterns) to help you regain access. We take safeguarding this data as seriously as PHI/PII.
+        </div>
+
+        <div class="info">
+            <strong>Need Help?</strong><br>
+            <a href="/">← Back to Home</a> | <a href="/data">📊 Data Stream</a>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_RECOVER_SUCCESS_PARTS = _encode_template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Recovery Successful - Yourl.Cloud</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+        .container { max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; text-align: center; }
+        .success { background: #d4edda; border: 1px solid #c3e6cb; padding: 15px; border-radius: 5px; margin: 20px 0; color: #155724; }
+        .code-display { background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: center; font-weight: bold; font-size: 18px; }
+        .info { background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }
+        .usage-stats { background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0; }
+        button { background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; margin: 5px; }
+        button:hover { background: #0056b3; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🎉 Recovery Successful!</h1>
+        <div class="success">
+            <strong>We found your experience!</strong><br>
+            {message}
+        </div>
+
+        <div class="code-display">
+            <strong>Suggested Code:</strong><br>
+            <span style="font-size: 24px; color: #007bff;">{suggested_code}</span>
+        </div>
+
+        <div class="usage-stats">
+            <strong>📊 Your Usage Pattern:</strong><br>
+            • Total attempts: {total_attempts}<br>
+            • Successful attempts: {successful_attempts}<br>
+            • Last successful: {last_successful}<br>
+            • Recovery method: {recovery_method}
+        </div>
+
+        <div style="text-align: center;">
+            <button onclick="window.location.href='/'">🏠 Go to Home</button>
+            <button id="copy-btn" data-code="{copy_code}">📋 Copy Code</button>
+        </div>
+
+        <div class="info">
+            <strong>Next Steps:</strong><br>
+            1. Copy the suggested code above<br>
+            2. Go to the <a href="/">home page</a><br>
+            3. Paste the code in the access field<br>
+            4. Enjoy your recovered experience!
+        </div>
+    </div>
+
+    <script src="/static/copy.js?v=""" + _ASSET_VERSION + """" defer></script>
+</body>
+</html>
+""", 'message', 'suggested_code', 'total_attempts', 'successful_attempts',
+   'last_successful', 'recovery_method', 'copy_code')
+
+# Display names for the recovery methods attempt_code_recovery() reports
+_METHOD_DISPLAY = {
+    method: method.replace('_', ' ').title()
+    for method in ('current_code_fallback', 'current_code_no_history', 'previous_success',
+                   'recent_attempt', 'current_code', 'current_code_error_fallback')
+}
+
+# Shared by both recovery failure pages
+_RECOVER_FAIL_TMPL = string.Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Recovery Failed - Yourl.Cloud</title>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }
+        .container { max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }
+        h1 { color: #333; text-align: center; }
+        .error { background: #f8d7da; border: 1px solid #f5c6cb; padding: 15px; border-radius: 5px; margin: 20px 0; color: #721c24; }
+        .info { background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h1>🔐 Recovery Failed</h1>
+        <div class="error">
+            <strong>$error_title</strong><br>
+            $error_body
+        </div>
+
+        <div class="info">
+            <strong>What you can do:</strong><br>
+            • <a href="/">Try the current live code</a><br>
+            • <a href="/recover">Try recovery again</a><br>
+            • Contact support if you need assistance$extra_actions
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+_RECOVER_NO_ID_HTML = _RECOVER_FAIL_TMPL.substitute(
+    error_title="No visitor ID found.",
+    error_body="""We couldn't identify your previous visits. This could happen if:
+            <ul>
+                <li>You're using a different browser or device</li>
+                <li>Your browser cookies were cleared</li>
+                <li>This is your first visit</li>
+            </ul>""",
+    extra_actions=""
+)
+
+_RECOVER_FAILED_ACTIONS = ("<br>\n            • Remember: It's OK to start over - "
+                           "the system will remember you based on how you use it!")
+
+def _get_cookie_fast(name):
+    """
+    Read one cookie by scanning the raw Cookie header, without building the
+    full cookie dict. Quoted values fall back to Werkzeug's parser.
+    """
+    header = request.headers.get('Cookie')
+    if not header:
+        return None
+    key = name + '='
+    i = header.find(key)
+    # Only accept matches that start a cookie pair: at the start of the header
+    # or after ";" and optional spaces (not "old_visitor_id=" or "a=b visitor_id=")
+    while i > 0 and header[:i].rstrip(' ')[-1:] not in ('', ';'):
+        i = header.find(key, i + 1)
+    if i < 0:
+        return None
+    i += len(key)
+    j = header.find(';', i)
+    value = header[i:j if j >= 0 else None].strip()
+    if value.startswith('"'):
+        return request.cookies.get(name)
+    return value
+
+def _static_page(html):
+    """
+    Encode a fixed HTML page once as (bytes, gzip bytes, ETag).
+    """
+    body = html.encode('utf-8')
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return body, compressor.compress(body) + compressor.flush(), hashlib.md5(body).hexdigest()
+
+def _static_page_response(page, cache_control=None):
+    """
+    Serve a page built by _static_page: gzip when accepted, and a 304 when a
+    GET already holds the matching ETag.
+    """
+    body, gz_body, etag = page
+    gzipped = bool(request.accept_encodings['gzip'])
+    if gzipped:
+        body, etag = gz_body, etag + '-gz'
+    if request.method == 'GET' and etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        # Bytes are final (and already compressed when accepted), so the body
+        # is passed through untouched and skipped by the gzip hook
+        response = Response(body, mimetype='text/html',
+                            direct_passthrough=True)
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    return response
+
+# The form is the same for every visitor, so browsers and the CDN may keep it
+_RECOVER_FORM_CACHE_CONTROL = 'public, max-age=300, stale-while-revalidate=60'
+
+_RECOVER_FORM_PAGE = _static_page(_RECOVER_FORM_HTML)
+_RECOVER_NO_ID_PAGE = _static_page(_RECOVER_NO_ID_HTML)
+
+# templates/recovery.html (when deployed) overrides the built-in form. It takes
+# no context, so it is rendered on first use and then served like the others.
+_recovery_template_page = None
+
+def _recovery_form_page():
+    """
+    The recovery form page, preferring templates/recovery.html when present.
+    """
+    global _recovery_template_page
+    if not _HAS_RECOVERY_TMPL:
+        return _RECOVER_FORM_PAGE
+    if _recovery_template_page is None:
+        _recovery_template_page = _static_page(render_template('recovery.html'))
+    return _recovery_template_page
+
+@app.route('/recover', methods=['GET'])
 def code_recovery() -> Response:
     """
-    Code recovery endpoint for users who forgot their codes.
+    Code recovery form for users who forgot their codes.
     Respects privacy by using only stored behavioral data.
     """
-    if request.method == 'GET':
-        # Show recovery form
-        if os.path.exists('templates/recovery.html'):
-            return make_response(render_template('recovery.html'))
-        else:
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Code Recovery - Yourl.Cloud</title>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    h1 {{ color: #333; text-align: center; }}
-                    .form-group {{ margin: 20px 0; }}
-                    label {{ display: block; margin-bottom: 5px; font-weight: bold; }}
-                    input[type="text"] {{ width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px; }}
-                    button {{ background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; }}
-                    button:hover {{ background: #0056b3; }}
-                    .info {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                    .recovery-message {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                    .privacy-note {{ background: #f8f9fa; padding: 10px; border-radius: 5px; margin: 20px 0; font-size: 14px; color: #666; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>🔐 Code Recovery</h1>
-                    <div class="info">
-                        <strong>Forgot your Yourl code?</strong><br>
-                        Don't worry! We can help you recover your experience based on your previous usage patterns.
-                    </div>
-                    
-                    <form method="POST">
-                        <div class="form-group">
-                            <label for="recovery_method">Recovery Method:</label>
-                            <select name="recovery_method" id="recovery_method" style="width: 100%; padding: 10px; border: 1px solid #ddd; border-radius: 5px; font-size: 16px;">
-                                <option value="auto">🤖 Automatic Recovery (Recommended)</option>
-                                <option value="manual">✍️ Manual Recovery</option>
-                            </select>
-                        </div>
-                        
-                        <div class="form-group">
-                            <label for="visitor_id">Visitor ID (if you remember it):</label>
-                            <input type="text" id="visitor_id" name="visitor_id" placeholder="Leave blank for automatic detection">
-                        </div>
-                        
-                        <button type="submit">🔍 Recover My Experience</button>
-                    </form>
-                    
-                    <div class="privacy-note">
-                        <strong>🔒 Privacy First:</strong> This recovery system uses only your stored behavioral data (codes you've used before, visit patterns) to help you regain access. We take safeguarding this data as seriously as PHI/PII.
-                    </div>
-                    
-                    <div class="info">
-                        <strong>Need Help?</strong><br>
-                        <a href="/">← Back to Home</a> | <a href="/data">📊 Data Stream</a>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            return make_response(html_content)
+    return _static_page_response(_recovery_form_page(), _RECOVER_FORM_CACHE_CONTROL)
+
+@app.route('/recover', methods=['POST'])
+def code_recovery_submit() -> Response:
+    """
+    Handle a code recovery request submitted from the form.
+    """
+    # Handle recovery request
+    visitor_id = request.form.get('visitor_id', '').strip()
     
-    elif request.method == 'POST':
-        # Handle recovery request
-        recovery_method = request.form.get('recovery_method', 'auto')
-        visitor_id = request.form.get('visitor_id', '').strip()
-        
-        # Get visitor ID from cookie if not provided
-        if not visitor_id:
-            visitor_id = request.cookies.get('visitor_id')
-        
-        if not visitor_id:
-            error_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Recovery Failed - Yourl.Cloud</title>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    h1 {{ color: #333; text-align: center; }}
-                    .error {{ background: #f8d7da; border: 1px solid #f5c6cb; padding: 15px; border-radius: 5px; margin: 20px 0; color: #721c24; }}
-                    .info {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>🔐 Recovery Failed</h1>
-                    <div class="error">
-                        <strong>No visitor ID found.</strong><br>
-                        We couldn't identify your previous visits. This could happen if:
-                        <ul>
-                            <li>You're using a different browser or device</li>
-                            <li>Your browser cookies were cleared</li>
-                            <li>This is your first visit</li>
-                        </ul>
-                    </div>
-                    
-                    <div class="info">
-                        <strong>What you can do:</strong><br>
-                        • <a href="/">Try the current live code</a><br>
-                        • <a href="/recover">Try recovery again</a><br>
-                        • Contact support if you need assistance
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            return make_response(error_html)
+    # Get visitor ID from cookie if not provided
+    if not visitor_id:
+        visitor_id = _get_cookie_fast('visitor_id')
+    
+    if not visitor_id:
+        return _static_page_response(_RECOVER_NO_ID_PAGE)
+    
+    # Attempt recovery
+    recovery_result = attempt_code_recovery(visitor_id)
+    
+    if recovery_result['success']:
+        suggested_code = recovery_result['suggested_code']
+        recovery_method_used = recovery_result['recovery_method']
+        usage_pattern = recovery_result.get('usage_pattern', {})
+        total_attempts = usage_pattern.get('total_attempts', 0)
+        successful_attempts = usage_pattern.get('successful_attempts', 0)
+        last_successful = usage_pattern.get('last_successful', 'None')
         
-        # Attempt recovery
-        recovery_result = attempt_code_recovery(
-            visitor_id=visitor_id,
-            user_agent=request.headers.get('User-Agent', ''),
-            ip_address=get_client_ip() or ''
+        safe_code = escape(suggested_code)
+        # Stream the pre-encoded page pieces around the escaped values
+        return Response(_iter_template(
+            _RECOVER_SUCCESS_PARTS,
+            escape(recovery_result['message']),
+            safe_code,
+            total_attempts,
+            successful_attempts,
+            escape(last_successful),
+            (_METHOD_DISPLAY.get(recovery_method_used)
+             or recovery_method_used.replace('_', ' ').title()),
+            safe_code
+        ), mimetype='text/html')
+    else:
+        # Recovery failed
+        failed_html = _RECOVER_FAIL_TMPL.substitute(
+            error_title="Recovery unsuccessful.",
+            error_body=escape(recovery_result['message']),
+            extra_actions=_RECOVER_FAILED_ACTIONS
         )
-        
-        if recovery_result['success']:
-            suggested_code = recovery_result['suggested_code']
-            recovery_method_used = recovery_result['recovery_method']
-            usage_pattern = recovery_result.get('usage_pattern', {})
-            
-            success_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Recovery Successful - Yourl.Cloud</title>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    h1 {{ color: #333; text-align: center; }}
-                    .success {{ background: #d4edda; border: 1px solid #c3e6cb; padding: 15px; border-radius: 5px; margin: 20px 0; color: #155724; }}
-                    .code-display {{ background: #fff3cd; border: 1px solid #ffeaa7; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: center; font-weight: bold; font-size: 18px; }}
-                    .info {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                    .usage-stats {{ background: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                    button {{ background: #007bff; color: white; padding: 12px 30px; border: none; border-radius: 5px; cursor: pointer; font-size: 16px; margin: 5px; }}
-                    button:hover {{ background: #0056b3; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>🎉 Recovery Successful!</h1>
-                    <div class="success">
-                        <strong>We found your experience!</strong><br>
-                        {recovery_result['message']}
-                    </div>
-                    
-                    <div class="code-display">
-                        <strong>Suggested Code:</strong><br>
-                        <span style="font-size: 24px; color: #007bff;">{suggested_code}</span>
-                    </div>
-                    
-                    <div class="usage-stats">
-                        <strong>📊 Your Usage Pattern:</strong><br>
-                        • Total attempts: {usage_pattern.get('total_attempts', 0)}<br>
-                        • Successful attempts: {usage_pattern.get('successful_attempts', 0)}<br>
-                        • Last successful: {usage_pattern.get('last_successful', 'None')}<br>
-                        • Recovery method: {recovery_method_used.replace('_', ' ').title()}
-                    </div>
-                    
-                    <div style="text-align: center;">
-                        <button onclick="window.location.href='/'">🏠 Go to Home</button>
-                        <button onclick="copyToClipboard('{suggested_code}')">📋 Copy Code</button>
-                    </div>
-                    
-                    <div class="info">
-                        <strong>Next Steps:</strong><br>
-                        1. Copy the suggested code above<br>
-                        2. Go to the <a href="/">home page</a><br>
-                        3. Paste the code in the access field<br>
-                        4. Enjoy your recovered experience!
-                    </div>
-                </div>
-                
-                <script>
-                function copyToClipboard(text) {{
-                    navigator.clipboard.writeText(text).then(function() {{
-                        alert('Code copied to clipboard!');
-                    }}, function(err) {{
-                        console.error('Could not copy text: ', err);
-                    }});
-                }}
-                </script>
-            </body>
-            </html>
-            """
-            return make_response(success_html)
-        else:
-            # Recovery failed
-            failed_html = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Recovery Failed - Yourl.Cloud</title>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 40px; background: #f5f5f5; }}
-                    .container {{ max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    h1 {{ color: #333; text-align: center; }}
-                    .error {{ background: #f8d7da; border: 1px solid #f5c6cb; padding: 15px; border-radius: 5px; margin: 20px 0; color: #721c24; }}
-                    .info {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin: 20px 0; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h1>🔐 Recovery Failed</h1>
-                    <div class="error">
-                        <strong>Recovery unsuccessful.</strong><br>
-                        {recovery_result['message']}
-                    </div>
-                    
-                    <div class="info">
-                        <strong>What you can do:</strong><br>
-                        • <a href="/">Try the current live code</a><br>
-                        • <a href="/recover">Try recovery again</a><br>
-                        • Contact support if you need assistance<br>
-                        • Remember: It's OK to start over - the system will remember you based on how you use it!
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            return make_response(failed_html)
-    
-    # Default return for any other method
-    return make_response("Method not allowed", 405)
+        return make_response(failed_html)
 
 if __name__ == '__main__':
-    # Determine the display address for users
-    if HOST == '0.0.0.0':
-        display_host = 'localhost'  # More user-friendly than 0.0.0.0
-    else:
-        display_host = HOST
-    
     # Get current marketing password
     current_password = get_current_marketing_password()
     
-    print(f"🚀 Starting URL API Server with Visual Inspection")
-    print(f"📍 Host: {display_host}")
-    print(f"🐛 Debug: {DEBUG}")
-    print(f"🏭 Production: {PRODUCTION} (All instances are production instances)")
-    print(f"🆔 Session: {FRIENDS_FAMILY_GUARD['session_id']}")
-    print(f"🏢 Organization: {FRIENDS_FAMILY_GUARD['organization']}")
-    print(f"🛡️ Friends and Family Guard: {'Enabled' if FRIENDS_FAMILY_GUARD['enabled'] else 'Disabled'}")
-    print(f"👁️ Visual Inspection: PC/Phone/Tablet allowed, Watch blocked")
-    print(f"☁️ Google Cloud Run Support: Enabled")
-    print(f"🌐 Domain Mapping: {'Enabled' if CLOUD_RUN_CONFIG['domain_mapping_enabled'] else 'Disabled'}")
-    print(f"🎪 Marketing Password: {current_password}")
-    print("=" * 60)
+    # Startup banner, written in one call
+    sys.stdout.write("\n".join([
+        "🚀 Starting URL API Server with Visual Inspection",
+        f"📍 Host: {DISPLAY_HOST}",
+        f"🐛 Debug: {DEBUG}",
+        f"🏭 Production: {PRODUCTION} (All instances are production instances)",
+        f"🆔 Session: {FRIENDS_FAMILY_GUARD['session_id']}",
+        f"🏢 Organization: {FRIENDS_FAMILY_GUARD['organization']}",
+        f"🛡️ Friends and Family Guard: {_FF_ENABLED_STR}",
+        "👁️ Visual Inspection: PC/Phone/Tablet allowed, Watch blocked",
+        "☁️ Google Cloud Run Support: Enabled",
+        f"🌐 Domain Mapping: {_DOMAIN_MAPPING_STR}",
+        f"🎪 Marketing Password: {current_password}",
+        "=" * 60,
+    ]) + "\n")
+    sys.stdout.flush()
     
     # Launch browser for local development (not for production/Cloud Run)
     if not os.environ.get('PORT'):
-        local_url = f"http://{display_host}:{PORT}"
-        print(f"🌐 Launching browser to: {local_url}")
-        launch_browser(local_url)
+        print(f"🌐 Launching browser to: {LOCAL_URL}")
+        launch_browser(LOCAL_URL)
     
     # Start with production WSGI server
     start_production_server()
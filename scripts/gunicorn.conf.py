@@ -31,10 +31,11 @@ keepalive = 2
 preload_app = True
 
 # Logging
-accesslog = "-"
+# Compact access log; set GUNICORN_ACCESS_LOG=/dev/null to drop it entirely
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
 errorlog = "-"
 loglevel = "info"
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
+access_log_format = '%(h)s "%(r)s" %(s)s %(M)sms'
 
 # Process naming
 proc_name = "yourl-cloud-api"
@@ -46,6 +47,8 @@ umask = 0
 user = None
 group = None
 tmp_upload_dir = None
+# Worker heartbeat files on tmpfs (avoids overlayfs stalls on Cloud Run)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
 
 # SSL (not needed for Cloud Run as it handles HTTPS)
 keyfile = None
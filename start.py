@@ -29,26 +29,11 @@ def start_production():
     if platform.system() == "Windows":
         print("🪟 Windows detected - using Waitress WSGI server")
         try:
-            # Try to import waitress
             import waitress
-            print("✅ Waitress found - starting production server...")
-            waitress.serve(app, host=HOST, port=PORT)
         except ImportError:
-            print("❌ Waitress not found. Installing...")
-            try:
-                subprocess.run([sys.executable, "-m", "pip", "install", "waitress"], check=True)
-                import waitress
-                print("✅ Waitress installed - starting production server...")
-                waitress.serve(app, host=HOST, port=PORT)
-            except Exception as e:
-                print(f"❌ Failed to install/use Waitress: {e}")
-                print("🔄 Falling back to Flask development server...")
-                app.run(
-                    host=HOST,
-                    port=PORT,
-                    debug=False,  # Always False in production
-                    threaded=True
-                )
+            raise RuntimeError("waitress not installed; add to requirements.txt")
+        print("✅ Waitress found - starting production server...")
+        waitress.serve(app, host=HOST, port=PORT)
     else:
         # Unix-like system - use Gunicorn
         print("🐧 Unix-like system detected - using Gunicorn WSGI server")
@@ -59,19 +44,20 @@ def start_production():
         ]
         
         try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to start Gunicorn: {e}")
-            sys.exit(1)
+            result = subprocess.run(cmd, check=False)
         except FileNotFoundError:
             print("❌ Gunicorn not found. Please install it with: pip install gunicorn")
-            print("🔄 Falling back to Flask development server...")
-            app.run(
-                host=HOST,
-                port=PORT,
-                debug=False,  # Always False in production
-                threaded=True
-            )
+            print("🔄 Falling back to a minimal Waitress server...")
+            import waitress
+            # Bounded thread pool instead of the Flask dev server's thread-per-request
+            waitress.serve(app, host=HOST, port=PORT, threads=2, connection_limit=100)
+            return
+        
+        # Gunicorn ran and exited (e.g. SIGTERM on Cloud Run) - propagate its
+        # exit code rather than falling back to another server mid-shutdown
+        if result.returncode != 0:
+            print(f"❌ Gunicorn exited with code {result.returncode}")
+            sys.exit(result.returncode)
 
 def main():
     """Main entry point - all instances are production instances."""
@@ -0,0 +1,37 @@
+// Copy the suggested recovery code (data-code on #copy-btn) to the clipboard
+function copyWithExecCommand(text) {
+    const field = document.createElement('textarea');
+    field.value = text;
+    field.setAttribute('readonly', '');
+    field.style.position = 'absolute';
+    field.style.left = '-9999px';
+    document.body.appendChild(field);
+    field.select();
+    let copied = false;
+    try {
+        copied = document.execCommand('copy');
+    } catch (err) {
+        console.error('Could not copy text: ', err);
+    }
+    document.body.removeChild(field);
+    return copied;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    const button = document.getElementById('copy-btn');
+    if (!button) {
+        return;
+    }
+    button.addEventListener('click', function() {
+        const text = button.dataset.code;
+        if (navigator.clipboard && window.isSecureContext) {
+            navigator.clipboard.writeText(text).then(function() {
+                alert('Code copied to clipboard!');
+            }, function(err) {
+                console.error('Could not copy text: ', err);
+            });
+        } else if (copyWithExecCommand(text)) {
+            alert('Code copied to clipboard!');
+        }
+    });
+});
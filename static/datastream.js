@@ -0,0 +1,61 @@
+// Update scroll position indicator
+window.addEventListener('scroll', function() {
+    document.getElementById('scrollPos').textContent = Math.round(window.scrollY);
+});
+
+// Add hover effects to frames
+document.querySelectorAll('.frame').forEach(frame => {
+    frame.addEventListener('mouseenter', function() {
+        this.style.background = 'rgba(0, 255, 0, 0.1)';
+        this.style.transform = 'scale(1.02)';
+    });
+
+    frame.addEventListener('mouseleave', function() {
+        this.style.background = 'rgba(0, 255, 0, 0.05)';
+        this.style.transform = 'scale(1)';
+    });
+});
+
+// Mind map filtering
+function filterByNode(node) {
+    const frames = document.querySelectorAll('.frame');
+    frames.forEach(frame => {
+        const nodes = frame.dataset.nodes.split(',');
+        if (nodes.includes(node)) {
+            frame.style.display = 'block';
+            frame.style.opacity = '1';
+        } else {
+            frame.style.opacity = '0.3';
+        }
+    });
+}
+
+// Auto-scroll animation
+let scrollSpeed = 0.5;
+function autoScroll() {
+    window.scrollBy(0, scrollSpeed);
+    requestAnimationFrame(autoScroll);
+}
+
+// Start auto-scroll after 3 seconds
+setTimeout(() => {
+    autoScroll();
+}, 3000);
+
+// Add keyboard navigation
+document.addEventListener('keydown', function(e) {
+    switch(e.key) {
+        case 'ArrowUp':
+            window.scrollBy(0, -100);
+            break;
+        case 'ArrowDown':
+            window.scrollBy(0, 100);
+            break;
+        case 'Home':
+            window.scrollTo(0, 0);
+            break;
+        case 'End':
+            window.scrollTo(0, document.body.scrollHeight);
+            break;
+    }
+});
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the hand-rolled fast paths in app.py match the
+straightforward behaviour they replace: gzip splicing, the Cookie header
+scan and the single-pass device regex
+"""
+
+import gzip
+import os
+import sys
+
+# Add current directory to path
+sys.path.insert(0, '.')
+
+os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'yourl-cloud')
+
+try:
+    import app as app_module
+except ImportError as e:
+    # Flask is not installed in this environment
+    print(f"⚠️ Skipping fast path tests: {e}")
+    app_module = None
+
+def baseline_detect_device_type(user_agent):
+    """Original keyword-scan device detection, kept as the reference"""
+    ua_lower = user_agent.lower()
+    if any(keyword in ua_lower for keyword in ['watch', 'wearable', 'smartwatch', 'apple watch', 'samsung gear']):
+        return 'watch'
+    if any(keyword in ua_lower for keyword in ['mobile', 'android', 'iphone', 'phone', 'blackberry']):
+        return 'phone'
+    if any(keyword in ua_lower for keyword in ['tablet', 'ipad', 'android']):
+        return 'tablet'
+    return 'pc'
+
+VISITOR_VARIANTS = [
+    {'visitor_id': 'abc123', 'total_visits': 1, 'is_new_visitor': True, 'has_used_code': False},
+    {'visitor_id': 'def456', 'total_visits': 7, 'is_new_visitor': False, 'has_used_code': False},
+    {'visitor_id': 'ghi789', 'total_visits': 3, 'is_new_visitor': False, 'has_used_code': True},
+    {'visitor_id': '<script>', 'total_visits': 2, 'is_new_visitor': True, 'has_used_code': True,
+     'tracking_key': 'tk-"quoted"&more'},
+    {},
+]
+
+COOKIE_HEADERS = [
+    None,
+    'visitor_id=abc',
+    'a=1; visitor_id=abc; b=2',
+    'x=1;visitor_id=z',
+    'visitor_id="quoted value"',
+    'visitor_id="a\\"b"; c=d',
+    'visitor_id=',
+    'visitor_id=; b=1',
+    'visitor_id=first; visitor_id=second',
+    'old_visitor_id=x; visitor_id=y',
+    'old_visitor_id=x',
+    'a=b visitor_id=evil; visitor_id=real',
+    'other=1',
+]
+
+USER_AGENTS = [
+    '',
+    # Desktop browsers
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+    'curl/8.4.0',
+    # Phones
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+    'Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
+    'BlackBerry9700/5.0.0.351 Profile/MIDP-2.1 Configuration/CLDC-1.1',
+    'Mozilla/5.0 (Windows Phone 10.0; Android 6.0.1) Edge/15.15063',
+    # Tablets
+    'Mozilla/5.0 (Linux; Android 13; SM-X700) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/604.1',
+    'Mozilla/5.0 (Linux; Tablet; rv:68.0) Gecko/68.0 Firefox/68.0',
+    'Mozilla/5.0 (Linux; U; en-us; KFAPWI Build/JDQ39) AppleWebKit/535.19 (KHTML, like Gecko) Silk/3.13 Safari/535.19 Tablet',
+    # Watches and wearables
+    'Mozilla/5.0 (Apple Watch; CPU Watch OS 10_0 like Mac OS X) AppleWebKit/605.1.15',
+    'Mozilla/5.0 (Linux; Android 11; SM-R870 Build/RP1A; wv) Samsung Gear Wearable Mobile',
+    'Mozilla/5.0 (Linux; Tizen 4.0; SmartWatch) AppleWebKit/537.36',
+    # Mixed case and keyword ordering
+    'MOZILLA/5.0 (IPHONE; CPU IPHONE OS 17_1) MOBILE',
+    'ipad tablet android mobile',
+    'Android Mobile Watch',
+]
+
+def test_gzip_splicing():
+    """Spliced gzip output must decompress to the plain body"""
+    if app_module is None:
+        return
+
+    for visitor_data in VISITOR_VARIANTS:
+        for experience_level in ('new_user', 'returning_user', 'custom_level'):
+            parts = app_module._auth_ok_parts(visitor_data, experience_level, 'v1.2.3', 'code<&>')
+            assert gzip.decompress(app_module._gzip_parts(parts)) == b"".join(parts)
+
+    # Static segments repeated, adjacent and mixed with empty dynamic parts
+    head, middle, tail = app_module._AUTH_OK_HEAD, app_module._AUTH_OK_MIDDLE, app_module._AUTH_OK_TAIL
+    for parts in ([], [b''], [head], [head, middle, tail], [b'x' * 70000, head, b'', head, tail, b'y']):
+        assert gzip.decompress(app_module._gzip_parts(parts)) == b"".join(parts)
+
+    print("✅ Spliced gzip output decompresses to the plain body")
+
+def test_cookie_fast_path():
+    """The raw Cookie header scan must agree with Werkzeug's parser"""
+    if app_module is None:
+        return
+
+    from flask import request
+
+    for header in COOKIE_HEADERS:
+        headers = {'Cookie': header} if header is not None else {}
+        with app_module.app.test_request_context(headers=headers):
+            fast = app_module._get_cookie_fast('visitor_id')
+            expected = request.cookies.get('visitor_id')
+            assert fast == expected, f"{header!r}: {fast!r} != {expected!r}"
+
+    print("✅ Cookie fast path matches request.cookies")
+
+def test_device_regex():
+    """The single-pass device regex must classify like the keyword scan"""
+    if app_module is None:
+        return
+
+    for user_agent in USER_AGENTS:
+        fast = app_module.detect_device_type(user_agent)
+        expected = baseline_detect_device_type(user_agent)
+        assert fast == expected, f"{user_agent!r}: {fast!r} != {expected!r}"
+
+    print("✅ Device regex matches the baseline detection")
+
+if __name__ == "__main__":
+    print("🧪 Testing Fast Path Equivalence")
+    print("=" * 50)
+
+    test_gzip_splicing()
+    test_cookie_fast_path()
+    test_device_regex()
+
+    print("\n" + "=" * 50)
+    print("✅ All tests passed!")